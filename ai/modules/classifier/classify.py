@@ -133,3 +133,52 @@ def classify(detect_results: Dict[str, Any], ocr_text: str = "") -> Dict[str, An
         "counts": counts,
         "ocr_text": ocr_text or ""
     }
+
+
+def config_version() -> str:
+    # changes whenever a keyword list, weight or threshold in classifier/config.py changes
+    import hashlib
+    settings = []
+    for name, value in sorted(vars(config).items()):
+        if not name.isupper():
+            continue
+        if isinstance(value, (set, frozenset)):
+            value = sorted(value)
+        settings.append(f"{name}={value!r}")
+    return hashlib.sha256("\n".join(settings).encode("utf-8")).hexdigest()[:12]
+
+
+def _file_risk(result: Dict[str, Any]) -> float:
+    # every file type reports risk on classify()'s 0..1 scale, clamp so one bad value can't dominate
+    return min(max(float(result.get("risk_score") or 0.0), 0.0), 1.0)
+
+
+def fuse_report(file_results: List[Dict[str, Any]], text: str = "") -> Dict[str, Any]:
+    """
+    Report-level risk from the per-file results plus the report's own text
+    (title, description, OCR). Strongest media evidence and text evidence are
+    combined as independent signals: 1 - (1 - media) * (1 - text).
+    """
+    text_res = classify({}, text)
+    media_risk = max((_file_risk(r) for r in file_results), default=0.0)
+    text_risk = text_res["risk_score"]
+    risk = 1.0 - (1.0 - media_risk) * (1.0 - text_risk)
+
+    tags = []
+    for r in file_results:
+        for t in r.get("ai_tags") or []:
+            if t not in tags:
+                tags.append(t)
+    for t in text_res["ai_tags"]:
+        if t not in tags:
+            tags.append(t)
+
+    return {
+        "risk_score": round(min(risk, 1.0), 4),
+        "media_risk": round(media_risk, 4),
+        "text_risk": round(text_risk, 4),
+        "ai_tags": tags,
+        "summary": "; ".join(tags) if tags else "no_suspicious_activity_detected",
+        "reasons": text_res["reasons"],
+        "files_analyzed": len(file_results),
+    }
@@ -1,6 +1,6 @@
 SUSPICIOUS_OBJECTS = {"handbag", "bag", "box", "envelope", "wallet", "package", "bottle"}
 
-DANGEROUS_OBJECTS = {"gun", "knife", "fire", "smoke", "pistol", "rifle", "scissor", "blade"}
+DANGEROUS_OBJECTS = {"gun", "knife", "fire", "smoke", "pistol", "rifle", "scissor", "scissors", "blade"}
 
 
 CROWD_PERSON_COUNT = 5
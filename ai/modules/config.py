@@ -0,0 +1,137 @@
+import os
+
+# inference worker pool
+# "process" runs each analysis in its own worker process, "thread" keeps the
+# models in the server process and runs analyses on a thread pool
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "process")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+# requests allowed to wait for a free worker before we start rejecting
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "8"))
+RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", "5"))
+
+# detection models. one COCO model covers people, dangerous and suspicious
+# objects in a single pass, a flag model only runs when real flag weights are set
+DETECT_MODEL = os.getenv("DETECT_MODEL", "yolov8n.pt")
+FLAG_MODEL = os.getenv("FLAG_MODEL", "")  # e.g. models/yolo_flags.pt
+
+# cross-request micro-batching for YOLO, only fills up when requests share a
+# process. Always on for the thread backend: its workers share one model, and
+# the batcher thread is what keeps them from calling it at the same time
+DETECT_BATCHING = INFERENCE_BACKEND == "thread" or os.getenv("DETECT_BATCHING", "0") == "1"
+DETECT_MAX_BATCH = int(os.getenv("DETECT_MAX_BATCH", "8"))
+DETECT_MAX_WAIT_MS = float(os.getenv("DETECT_MAX_WAIT_MS", "10"))
+
+# stage result cache, bump a version when the model / settings behind a stage change
+CACHE_MAX_MB = int(os.getenv("CACHE_MAX_MB", "256"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+DETECT_VERSION = os.getenv("DETECT_VERSION", f"{DETECT_MODEL}+{FLAG_MODEL or '-'}")
+OCR_VERSION = os.getenv("OCR_VERSION", "easyocr-ne-en")
+VIDEO_VERSION = os.getenv("VIDEO_VERSION", "2")  # 2: frame risk on the 0..1 scale
+
+# uploads are streamed in chunks, never held whole in memory
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_IMAGE_MB = int(os.getenv("MAX_IMAGE_MB", "20"))
+MAX_VIDEO_MB = int(os.getenv("MAX_VIDEO_MB", "500"))
+MAX_PDF_MB = int(os.getenv("MAX_PDF_MB", "50"))
+
+# async jobs, the sqlite file and the uploaded inputs survive a restart
+JOBS_DB = os.getenv("JOBS_DB", "jobs.db")
+JOBS_DIR = os.getenv("JOBS_DIR", "job_files")
+# jobs running at once, the rest wait their turn so /analyze keeps some workers
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "1"))
+CALLBACK_TIMEOUT_SECONDS = int(os.getenv("CALLBACK_TIMEOUT_SECONDS", "10"))
+
+# /analyze/batch, all media of one report in a single call; its videos take at
+# most INFERENCE_WORKERS pool slots at a time, so any number of them fits the pool
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "20"))
+MAX_BATCH_MB = int(os.getenv("MAX_BATCH_MB", "1024"))
+
+# per-request diagnostics
+# ?timings=1 or X-Timings: 1 adds a per-stage breakdown to the response
+# X-Profile: 1 (when allowed) or PROFILE_REQUESTS=1 profiles the request into PROFILE_DIR
+# off by default: profiles land on the server's disk and the response names their path
+ALLOW_PROFILE_HEADER = os.getenv("ALLOW_PROFILE_HEADER", "0") == "1"
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# requests slower than this are written to the slow request log
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "10000"))
+SLOW_REQUEST_LOG = os.getenv("SLOW_REQUEST_LOG", "slow_requests.log")
+
+# set by the prefork master (server/prefork.py), 0 for a plain single server
+WORKER_ID = int(os.getenv("WORKER_ID", "0"))
+PREFORK_WORKERS = int(os.getenv("PREFORK_WORKERS", "2"))
+# move model weights into shared memory before forking, so even pages torch
+# writes to stay shared instead of being copied per worker
+PREFORK_SHARE_MEMORY = os.getenv("PREFORK_SHARE_MEMORY", "0") == "1"
+
+# video analysis
+# sampled frames per detection / OCR batch
+VIDEO_BATCH_SIZE = int(os.getenv("VIDEO_BATCH_SIZE", "8"))
+# "interval", "budget" or "keyframes" (keyframes needs PyAV)
+VIDEO_SAMPLE_MODE = os.getenv("VIDEO_SAMPLE_MODE", "interval")
+VIDEO_SAMPLE_EVERY_S = float(os.getenv("VIDEO_SAMPLE_EVERY_S", "1.0"))
+# analyse at most this many frames spread over the clip, 0 = no budget
+VIDEO_FRAME_BUDGET = int(os.getenv("VIDEO_FRAME_BUDGET", "0"))
+# skip detection / OCR on frames that look the same as the last analysed one
+VIDEO_SCENE_GATE = os.getenv("VIDEO_SCENE_GATE", "1") == "1"
+SCENE_MAX_HASH_DISTANCE = int(os.getenv("SCENE_MAX_HASH_DISTANCE", "4"))  # of 64 bits
+SCENE_MIN_HIST_CORRELATION = float(os.getenv("SCENE_MIN_HIST_CORRELATION", "0.98"))
+# adaptive mode: sparse low resolution pass, then dense sampling around risky moments
+ADAPTIVE_COARSE_EVERY_S = float(os.getenv("ADAPTIVE_COARSE_EVERY_S", "2.0"))
+ADAPTIVE_DENSE_EVERY_S = float(os.getenv("ADAPTIVE_DENSE_EVERY_S", "0.25"))
+ADAPTIVE_COARSE_IMGSZ = int(os.getenv("ADAPTIVE_COARSE_IMGSZ", "320"))
+ADAPTIVE_COARSE_MAX_SIDE = int(os.getenv("ADAPTIVE_COARSE_MAX_SIDE", "640"))
+ADAPTIVE_TRIGGER_TAGS = set(os.getenv(
+    "ADAPTIVE_TRIGGER_TAGS",
+    "person_with_weapon_or_fire,crowd_with_danger,dangerous_object_present",
+).split(","))
+# tracking mode: full detection every TRACK_DETECT_EVERY tracked frames, optical flow in between
+VIDEO_TRACKING = os.getenv("VIDEO_TRACKING", "0") == "1"
+TRACK_EVERY_S = float(os.getenv("TRACK_EVERY_S", "0.2"))
+TRACK_DETECT_EVERY = int(os.getenv("TRACK_DETECT_EVERY", "5"))
+TRACK_FLOW_MAX_SIDE = int(os.getenv("TRACK_FLOW_MAX_SIDE", "480"))
+TRACK_IOU_THRESHOLD = float(os.getenv("TRACK_IOU_THRESHOLD", "0.3"))
+TRACK_MAX_LOST_S = float(os.getenv("TRACK_MAX_LOST_S", "2.0"))
+TRACK_MIN_HITS = int(os.getenv("TRACK_MIN_HITS", "2"))
+# staged video pipeline: decode / detect / OCR threads joined by bounded queues
+VIDEO_PIPELINE = os.getenv("VIDEO_PIPELINE", "1") == "1"
+# every detect / OCR worker past the first loads its own copy of the models (the
+# detect stage shares the batcher's instead when DETECT_BATCHING is on), so extra
+# workers cost memory as well as CPU
+PIPELINE_DETECT_WORKERS = int(os.getenv("PIPELINE_DETECT_WORKERS", "1"))
+PIPELINE_OCR_WORKERS = int(os.getenv("PIPELINE_OCR_WORKERS", "1"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "2"))  # batches between two stages
+# long clips: split into one time segment per process, each process loads its own models.
+# The total across the server: every inference worker process gets
+# VIDEO_SEGMENT_WORKERS // INFERENCE_WORKERS of them (thread backend: all), and
+# segments only when that leaves it more than one. Budgets and progress streams
+# follow the frames one by one, which segment processes don't report, so a request
+# under a budget (its own limits or any BUDGET_* default) is never segmented
+VIDEO_SEGMENT_WORKERS = int(os.getenv("VIDEO_SEGMENT_WORKERS", "0"))  # 0/1 = single pass
+VIDEO_SEGMENT_MIN_S = float(os.getenv("VIDEO_SEGMENT_MIN_S", "120"))
+# video aggregation, bounded whatever the clip length
+TIMELINE_BUCKET_S = float(os.getenv("TIMELINE_BUCKET_S", "1.0"))
+TIMELINE_MAX_POINTS = int(os.getenv("TIMELINE_MAX_POINTS", "600"))  # buckets double in length past this
+VIDEO_EXAMPLE_DETECTIONS = int(os.getenv("VIDEO_EXAMPLE_DETECTIONS", "10"))
+VIDEO_MAX_OCR_LINES = int(os.getenv("VIDEO_MAX_OCR_LINES", "200"))
+# live stream monitoring
+MAX_STREAMS = int(os.getenv("MAX_STREAMS", "8"))
+STREAM_DEFAULT_FPS = float(os.getenv("STREAM_DEFAULT_FPS", "1.0"))
+STREAM_MAX_FPS = float(os.getenv("STREAM_MAX_FPS", "5.0"))
+STREAM_MAX_SIDE = int(os.getenv("STREAM_MAX_SIDE", "960"))  # frames are shrunk before going to the pool
+STREAM_EVENT_RISK = float(os.getenv("STREAM_EVENT_RISK", "0.5"))
+STREAM_MAX_EVENTS = int(os.getenv("STREAM_MAX_EVENTS", "500"))  # kept per stream
+# stopped / failed streams stay readable this long, at most MAX_STREAMS of them
+STREAM_KEEP_ENDED_S = float(os.getenv("STREAM_KEEP_ENDED_S", "300"))
+# local files as stream sources (for testing without a camera)
+STREAM_ALLOW_FILES = os.getenv("STREAM_ALLOW_FILES", "0") == "1"
+# stream scheduler: one fps budget shared by all streams
+STREAM_FPS_BUDGET = float(os.getenv("STREAM_FPS_BUDGET", "4.0"))
+STREAM_RISK_WEIGHT = float(os.getenv("STREAM_RISK_WEIGHT", "3.0"))  # share of a recently risky stream vs a calm one
+STREAM_PRIORITY_WINDOW_S = float(os.getenv("STREAM_PRIORITY_WINDOW_S", "60"))
+STREAM_MIN_FPS = float(os.getenv("STREAM_MIN_FPS", "0.05"))
+# analysis budgets (0 = unlimited), requests can pass their own
+BUDGET_MAX_MS = int(os.getenv("BUDGET_MAX_MS", "0"))
+BUDGET_MAX_FRAMES = int(os.getenv("BUDGET_MAX_FRAMES", "0"))
+BUDGET_MAX_OCR_CALLS = int(os.getenv("BUDGET_MAX_OCR_CALLS", "0"))
+BUDGET_STOP_RISK = float(os.getenv("BUDGET_STOP_RISK", "0"))  # 0..1 frame risk
@@ -0,0 +1,116 @@
+# modules/detector/batch.py
+# gathers images from concurrent callers and runs them through YOLO as one batch
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+# one batcher per model object in this process
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+class MicroBatcher:
+    """
+    Collects up to `max_batch` images or waits `max_wait_ms` after the first one,
+    whichever comes first, then runs a single model call for the whole batch.
+    All model calls happen on the batcher thread, so callers on different
+    threads never touch the model at the same time.
+    """
+
+    def __init__(self, model, max_batch=8, max_wait_ms=10, name="model"):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._images = 0
+        self._batch_sizes = {}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._thread = threading.Thread(target=self._loop, name=f"batcher-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, image, imgsz=None):
+        # imgsz: inference size for this image, None = the model default
+        future = Future()
+        self._queue.put((image, future, time.perf_counter(), imgsz))
+        return future
+
+    def predict(self, image, imgsz=None):
+        return self.submit(image, imgsz).result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            self._record(batch, started)
+
+            # one model call per inference size present in the batch
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[3], []).append(item)
+
+            for imgsz, items in groups.items():
+                images = [item[0] for item in items]
+                kwargs = {"imgsz": imgsz} if imgsz else {}
+                try:
+                    preds = self.model(images, verbose=False, **kwargs)
+                except Exception as e:
+                    for item in items:
+                        item[1].set_exception(e)
+                    continue
+
+                # ultralytics returns one Results per input, in input order
+                for item, pred in zip(items, preds):
+                    item[1].set_result(pred)
+
+    def _record(self, batch, started):
+        waits = [started - item[2] for item in batch]
+        with self._stats_lock:
+            self._batches += 1
+            self._images += len(batch)
+            self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "batches": self._batches,
+                "images": self._images,
+                "avg_batch_size": round(self._images / self._batches, 2) if self._batches else 0.0,
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+                "avg_queue_wait_ms": round(self._wait_total / self._images * 1000, 2) if self._images else 0.0,
+                "max_queue_wait_ms": round(self._wait_max * 1000, 2),
+                "pending": self._queue.qsize(),
+            }
+
+
+def get_batcher(model, name="model", max_batch=8, max_wait_ms=10):
+    with _batchers_lock:
+        batcher = _batchers.get(id(model))
+        if batcher is None:
+            batcher = MicroBatcher(model, max_batch=max_batch, max_wait_ms=max_wait_ms, name=name)
+            _batchers[id(model)] = batcher
+        return batcher
+
+
+def batch_stats():
+    with _batchers_lock:
+        return {b.name: b.stats() for b in _batchers.values()}
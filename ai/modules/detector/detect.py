@@ -1,38 +1,89 @@
 import cv2
+from modules import config
+from modules.detector.batch import get_batcher
+from modules.utils.metrics import stage
 
-def detect_image(image_path, flag_model, person_model):
-    results = {
-        "flags": [],
-        "people": []
-    }
+def _predict_many(model, images, name, imgsz=None):
+    # one Results per image, in order
+    if config.DETECT_BATCHING:
+        # route through the shared batcher so concurrent requests ride in one forward pass
+        batcher = get_batcher(
+            model, name=name,
+            max_batch=config.DETECT_MAX_BATCH,
+            max_wait_ms=config.DETECT_MAX_WAIT_MS,
+        )
+        futures = [batcher.submit(image, imgsz) for image in images]
+        return [f.result() for f in futures]
 
-    # flag/symbol
-    try:
-        flag_preds = flag_model(image_path)
+    kwargs = {"imgsz": imgsz} if imgsz else {}
+    preds = []
+    for i in range(0, len(images), config.DETECT_MAX_BATCH):
+        preds.extend(model(images[i:i + config.DETECT_MAX_BATCH], verbose=False, **kwargs))
+    return preds
 
-        for pred in flag_preds:
-            for box in pred.boxes:
-                results["flags"].append({
-                    "class": int(box.cls),
-                    "confidence": float(box.conf[0]),
-                    "xyxy": box.xyxy[0].tolist()
-                })
+def _boxes(pred):
+    # one tensor -> list conversion per image instead of per box, plain python out
+    boxes = pred.boxes
+    xyxy = boxes.xyxy.tolist()
+    conf = boxes.conf.tolist()
+    cls = boxes.cls.tolist()
+    for i in range(len(xyxy)):
+        yield int(cls[i]), round(conf[i], 4), [round(v, 1) for v in xyxy[i]]
 
-    except Exception as e:
-        print("Flag detection error:", e)
+def _coco_results(pred, results):
+    # every box keeps its class name
+    for cls, conf, xyxy in _boxes(pred):
+        obj = {
+            "name": pred.names[cls],
+            "class": cls,
+            "confidence": conf,
+            "xyxy": xyxy
+        }
+        results["objects"].append(obj)
+        if obj["name"] == "person":
+            results["people"].append({
+                "confidence": conf,
+                "xyxy": xyxy
+            })
 
-    # person
-    try:
-        person_preds = person_model(image_path)
+def _flag_results(pred, results):
+    for cls, conf, xyxy in _boxes(pred):
+        flag = {
+            "class": cls,
+            "confidence": conf,
+            "xyxy": xyxy
+        }
+        results["flags"].append(flag)
+        results["objects"].append({"name": "flag", **flag})
 
-        for pred in person_preds:
-            for box in pred.boxes:
-                results["people"].append({
-                    "confidence": float(box.conf[0]),
-                    "xyxy": box.xyxy[0].tolist()
-                })
+def detect_images(images, flag_model, person_model, imgsz=None):
+    # images are file paths or decoded BGR arrays, run through the models as batches
+    # imgsz: smaller inference size for cheap passes, None = model default (640)
+    all_results = [{"objects": [], "flags": [], "people": []} for _ in images]
+    if not images:
+        return all_results
 
+    # one pass of the COCO model covers people, dangerous and suspicious objects
+    try:
+        with stage("detect_coco"):
+            preds = _predict_many(person_model, images, "coco", imgsz)
+        for pred, results in zip(preds, all_results):
+            _coco_results(pred, results)
     except Exception as e:
-        print("Person detection error:", e)
+        print("Detection error:", e)
+
+    # flag/symbol, only when dedicated flag weights are loaded
+    if flag_model is not None and flag_model is not person_model:
+        try:
+            with stage("detect_flag"):
+                preds = _predict_many(flag_model, images, "flag", imgsz)
+            for pred, results in zip(preds, all_results):
+                _flag_results(pred, results)
+        except Exception as e:
+            print("Flag detection error:", e)
+
+    return all_results
 
-    return results
+def detect_image(image, flag_model, person_model):
+    # image is a file path or a decoded BGR array, both models share it
+    return detect_images([image], flag_model, person_model)[0]
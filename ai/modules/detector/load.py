@@ -1,11 +1,29 @@
+import threading
 from ultralytics import YOLO
+from modules import config
+
+# one set of models per process, slot 0; pipeline workers that need a copy of
+# their own ask for another slot
+_models = {}
+_models_lock = threading.Lock()
 
 def load_models():
-    #later when we train model and put it in models/
-    # flag_model = YOLO("models/yolo_flags.pt")
-    # person_model = YOLO("models/yolo_person.pt")  
+    # person_model is the general COCO detector, it also finds knives, bottles, bags...
+    person_model = YOLO(config.DETECT_MODEL)
 
-    # temporary workaround for mvp
-    person_model = YOLO("yolov8n.pt")  
-    flag_model = YOLO("yolov8n.pt")  
+    # only load a second model when genuinely different weights are configured
+    # (later: models/yolo_flags.pt once we train it)
+    flag_model = None
+    if config.FLAG_MODEL and config.FLAG_MODEL != config.DETECT_MODEL:
+        flag_model = YOLO(config.FLAG_MODEL)
     return flag_model, person_model
+
+def get_models(slot=0):
+    models = _models.get(slot)
+    if models is None:
+        # thread backend workers may all ask at once during warm-up
+        with _models_lock:
+            models = _models.get(slot)
+            if models is None:
+                models = _models[slot] = load_models()
+    return models
@@ -0,0 +1,105 @@
+# modules/jobs/store.py
+# durable job records in sqlite, shared by the server and the pool workers
+import json
+import sqlite3
+import time
+import uuid
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    inputs TEXT NOT NULL,
+    params TEXT NOT NULL,
+    callback_url TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class JobStore:
+    """
+    Every call opens its own connection, so the store can be used from the
+    event loop, threads and other processes (video progress comes from pool workers).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def create(self, kind, inputs, params=None, callback_url=None):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, progress, inputs, params, callback_url, created_at, updated_at)"
+                " VALUES (?, ?, ?, 0, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, json.dumps(inputs), json.dumps(params or {}), callback_url, now, now),
+            )
+        return job_id
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["inputs"] = json.loads(job["inputs"])
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def _update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def mark_running(self, job_id):
+        self._update(job_id, status=RUNNING)
+
+    def set_progress(self, job_id, progress):
+        self._update(job_id, progress=round(min(max(progress, 0.0), 1.0), 3))
+
+    def finish(self, job_id, result):
+        self._update(job_id, status=DONE, progress=1.0, result=json.dumps(result), error=None)
+
+    def fail(self, job_id, error):
+        self._update(job_id, status=FAILED, error=str(error))
+
+    def unfinished(self):
+        # jobs that were queued or interrupted mid-run by a restart
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+def progress_reporter(db_path, job_id, min_step=0.01):
+    """Callback for long tasks, writes progress to the store at most every `min_step`."""
+    store = JobStore(db_path)
+    last = [-1.0]
+
+    def report(progress):
+        if progress - last[0] >= min_step or progress >= 1.0:
+            last[0] = progress
+            store.set_progress(job_id, progress)
+
+    return report
@@ -0,0 +1,51 @@
+import re
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+def split_paragraphs(text):
+    return [p.strip() for p in text.split("\n") if len(p.strip()) > 20]
+
+def simple_extractive_summary(text, max_sentences=5):
+    sentences = re.split(r'(?<=[.!?])\s+', text.strip())
+    scored = sorted(sentences, key=lambda s: len(s), reverse=True)
+    return " ".join(scored[:max_sentences])
+
+def compare_texts_simple(text_a, text_b, top_k=5):
+    paras_a = split_paragraphs(text_a)
+    paras_b = split_paragraphs(text_b)
+    all_paras = paras_a + paras_b
+
+    vectorizer = TfidfVectorizer().fit(all_paras)
+    tfidf_a = vectorizer.transform(paras_a)
+    tfidf_b = vectorizer.transform(paras_b)
+
+    cos_scores = cosine_similarity(tfidf_a, tfidf_b)
+    overall_score = float(cos_scores.mean())
+
+    # Top similar paragraph pairs
+    flat = cos_scores.flatten()
+    idxs = np.argsort(-flat)[:top_k]
+    top_pairs = []
+    for idx in idxs:
+        i = int(idx // cos_scores.shape[1])
+        j = int(idx % cos_scores.shape[1])
+        score = float(cos_scores[i, j])
+        top_pairs.append({
+            "score": round(score, 3),
+            "para_a": paras_a[i],
+            "para_b": paras_b[j]
+        })
+
+    # Unique paragraphs
+    unique_a = [p for i,p in enumerate(paras_a) if not any(cos_scores[i,j]>0.5 for j in range(len(paras_b)))]
+    unique_b = [p for j,p in enumerate(paras_b) if not any(cos_scores[i,j]>0.5 for i in range(len(paras_a)))]
+
+    return {
+        "overall_score": round(overall_score,3),
+        "top_pairs": top_pairs,
+        "summary_a": simple_extractive_summary(text_a),
+        "summary_b": simple_extractive_summary(text_b),
+        "unique_a": unique_a[:5],
+        "unique_b": unique_b[:5]
+    }
@@ -8,15 +8,47 @@ from pdf2image import convert_from_path
 from fastapi import FastAPI, UploadFile, File
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from modules.utils.metrics import stage
+from modules.utils.budget import BudgetExhausted, current_budget
 
 app = FastAPI()
 
+def _ocr_pages(pdf_path, page_count):
+    budget = current_budget()
+    if budget is None or not page_count:
+        # page count unknown under a budget: the whole file counts as one OCR call
+        if budget is not None and not budget.take_ocr(1):
+            return []
+        with stage("pdf_rasterize"):
+            pages = convert_from_path(pdf_path, dpi=200)
+        with stage("tesseract_ocr"):
+            return [pytesseract.image_to_string(p, lang='eng+nep') for p in pages]
+
+    # under a budget: one page at a time, so it can stop between pages
+    texts = []
+    for number in range(1, page_count + 1):
+        try:
+            budget.check()
+        except BudgetExhausted:
+            break
+        if not budget.take_ocr(1):
+            budget.ocr_skipped += page_count - number
+            break
+        with stage("pdf_rasterize"):
+            pages = convert_from_path(pdf_path, dpi=200, first_page=number, last_page=number)
+        with stage("tesseract_ocr"):
+            texts.extend(pytesseract.image_to_string(p, lang='eng+nep') for p in pages)
+    return texts
+
 def extract_text_from_pdf(pdf_path, try_ocr=True):
     text_chunks = []
+    page_count = 0
     try:
-        reader = PdfReader(pdf_path)
-        for page in reader.pages:
-            text_chunks.append(page.extract_text() or "")
+        with stage("pdf_text"):
+            reader = PdfReader(pdf_path)
+            page_count = len(reader.pages)
+            for page in reader.pages:
+                text_chunks.append(page.extract_text() or "")
     except Exception:
         text_chunks = [""]
 
@@ -25,15 +57,15 @@ def extract_text_from_pdf(pdf_path, try_ocr=True):
     # If text is very short, try OCR
     if len(full_text) < 200 and try_ocr:
         try:
-            pages = convert_from_path(pdf_path, dpi=200)
-            ocr_texts = [pytesseract.image_to_string(p, lang='eng+nep') for p in pages]
+            ocr_texts = _ocr_pages(pdf_path, page_count)
             ocr_full = "\n".join(ocr_texts).strip()
             if ocr_full:
                 full_text = ocr_full
         except Exception:
             try:
                 im = Image.open(pdf_path)
-                ocr_text = pytesseract.image_to_string(im, lang='eng+nep')
+                with stage("tesseract_ocr"):
+                    ocr_text = pytesseract.image_to_string(im, lang='eng+nep')
                 if ocr_text.strip():
                     full_text = ocr_text
             except Exception:
@@ -0,0 +1,166 @@
+# modules/schemas.py
+# response shapes of the AI server. these document the API (openapi / the .NET client);
+# handlers already build plain python dicts of this shape, so nothing is validated or
+# converted on the way out.
+from typing import Any, Dict, List, Optional, Union
+from pydantic import BaseModel, Field
+
+
+class DetectedObject(BaseModel):
+    name: str
+    class_id: int = Field(alias="class")
+    confidence: float
+    xyxy: List[float]
+
+
+class DetectedPerson(BaseModel):
+    confidence: float
+    xyxy: List[float]
+
+
+class DetectedFlag(BaseModel):
+    class_id: int = Field(alias="class")
+    confidence: float
+    xyxy: List[float]
+
+
+class Detections(BaseModel):
+    objects: List[DetectedObject] = []
+    flags: List[DetectedFlag] = []
+    people: List[DetectedPerson] = []
+
+
+class OcrSegment(BaseModel):
+    bbox: List[List[float]]
+    text: str
+    confidence: float
+
+
+class OcrResult(BaseModel):
+    text: str
+    segments: List[OcrSegment] = []
+
+
+class ImageAnalysis(BaseModel):
+    ai_tags: List[str]
+    risk_score: float
+    summary: str
+    objects: Detections
+    ocr: OcrResult
+
+
+class VideoAnalysis(BaseModel):
+    risk_score: float
+    ai_tags: List[str]
+    summary: str
+    reasons: List[str]
+    tag_counts: Dict[str, int]
+    # distinct OCR lines, one per line
+    ocr_text: str
+    # a random sample of analysed frames' detections, in time order
+    detections: List[Detections]
+    frames_analyzed: int
+    # sampled frames whose detection / OCR was reused from a near-identical earlier frame
+    frames_skipped: int = 0
+    # true when a request budget stopped the analysis early or skipped OCR
+    partial: bool = False
+    # with a budget: stopped_by, elapsed_ms, frames, ocr_calls, ocr_skipped, limits
+    budget: Optional[Dict[str, Any]] = None
+    sampling: Optional[Dict[str, Any]] = None
+    # {"bucket_s": seconds per point, "max_risk": [highest frame risk per bucket, null = no frame]}
+    timeline: Optional[Dict[str, Any]] = None
+    # tracking mode only: unique_people, max_people_in_frame, dwell times...
+    tracking: Optional[Dict[str, Any]] = None
+    # pipelined runs: per stage workers, items, busy_s, wall_s, utilisation
+    pipeline: Optional[Dict[str, Dict[str, float]]] = None
+
+
+AnalyzeResponse = Union[ImageAnalysis, VideoAnalysis]
+
+
+class FileError(BaseModel):
+    error: str
+
+
+class ReportRisk(BaseModel):
+    risk_score: float
+    media_risk: float
+    text_risk: float
+    ai_tags: List[str]
+    summary: str
+    reasons: List[str]
+    files_analyzed: int
+
+
+class BatchResponse(BaseModel):
+    # each entry is an ImageAnalysis / VideoAnalysis / FileError plus its filename
+    files: List[Dict[str, Any]]
+    report: ReportRisk
+
+
+class SimilarPair(BaseModel):
+    score: float
+    para_a: str
+    para_b: str
+
+
+class CompareSummary(BaseModel):
+    overall_score: float
+    top_pairs: List[SimilarPair]
+    summary_a: str
+    summary_b: str
+    unique_a: List[str]
+    unique_b: List[str]
+    # true when the budget cut the PDFs' OCR short
+    partial: bool = False
+    budget: Optional[Dict[str, Any]] = None
+
+
+class JobCreated(BaseModel):
+    job_id: str
+    status: str
+
+
+class JobView(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    progress: float
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+
+
+class StreamStatus(BaseModel):
+    stream_id: str
+    name: str
+    source: str
+    state: str
+    error: Optional[str] = None
+    fps: float
+    allocated_fps: float
+    started_at: float
+    frames_analyzed: int
+    # reused from a near-identical previous frame
+    frames_skipped: int
+    frames_read: int
+    # read from the source but replaced by a newer frame before analysis
+    frames_dropped: int
+    ticks_missed: int
+    busy_drops: int
+    reconnects: int
+    lag_s: float
+    last_risk: float
+    last_tags: List[str]
+    alert: bool
+
+
+class StreamEvent(BaseModel):
+    seq: int
+    stream_id: str
+    type: str  # "risk" or "clear"
+    time: float
+    risk_score: float
+    ai_tags: List[str]
+    summary: str
@@ -0,0 +1,255 @@
+# modules/streams/monitor.py
+# continuous analysis of a camera feed (RTSP / HTTP URL, or a looping local file
+# standing in for one): always the newest frame, risk events as they happen
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import deque
+import cv2
+from modules import config
+from modules.utils.pool import PoolFull
+from modules.utils.scene import SceneGate
+from modules.utils.preprocess import downscale
+
+RUNNING = "running"
+STOPPED = "stopped"
+FAILED = "failed"
+
+
+class FrameReader:
+    """
+    Reads the source on its own thread and keeps only the latest frame, so a
+    slow consumer always gets what the camera shows now instead of a backlog.
+    Frames replaced before anyone took them count as dropped.
+    A local file is played at its own frame rate, from the start again if `loop`.
+    """
+
+    def __init__(self, source, loop=False, reconnect_s=2.0):
+        self.source = source
+        self.loop = loop
+        self.reconnect_s = reconnect_s
+        self.is_file = os.path.exists(source)
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.reconnects = 0
+        self.finished = False
+        self._latest = None  # (seq, captured_at, frame)
+        self._taken = True
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stream-reader", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def latest(self):
+        with self._lock:
+            self._taken = True
+            return self._latest
+
+    def _publish(self, frame):
+        with self._lock:
+            if not self._taken:
+                self.frames_dropped += 1
+            self.frames_read += 1
+            self._latest = (self.frames_read, time.time(), frame)
+            self._taken = False
+
+    def _run(self):
+        while not self._stop.is_set():
+            cap = cv2.VideoCapture(self.source)
+            if cap.isOpened():
+                self._read(cap)
+            cap.release()
+            if self.is_file and not self.loop:
+                break
+            if not self.is_file and not self._stop.is_set():
+                # camera went away, try again in a moment
+                self.reconnects += 1
+                self._stop.wait(self.reconnect_s)
+        self.finished = True
+
+    def _read(self, cap):
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        interval = 1.0 / fps if self.is_file and 0 < fps <= 1000 else 0.0
+        next_at = time.perf_counter()
+        while not self._stop.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                return
+            self._publish(frame)
+            if interval:
+                # a file would otherwise be read far faster than real time
+                next_at += interval
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_at = time.perf_counter()
+
+
+class StreamMonitor:
+    """
+    Samples the reader's latest frame `fps` times a second, or at whatever lower
+    rate the `scheduler` allots it, and runs it through `analyse` (an async
+    callable: frame -> (detect, ocr, classification)).
+    A tick that comes round while the previous frame is still being analysed is
+    skipped rather than queued, so the lag behind real time stays bounded.
+    Risk events (frames at or above `event_risk`, and the all-clear after them)
+    go into a bounded list that clients poll with `events(after=seq)`.
+    """
+
+    def __init__(self, stream_id, source, analyse, fps=1.0, loop=False, name="",
+                 event_risk=None, max_events=None, max_side=None, scheduler=None):
+        self.id = stream_id
+        self.source = source
+        self.name = name or stream_id
+        self.analyse = analyse
+        self.fps = fps
+        self.scheduler = scheduler
+        self.loop = loop
+        self.event_risk = config.STREAM_EVENT_RISK if event_risk is None else event_risk
+        self.max_side = max_side or config.STREAM_MAX_SIDE
+        self.events_log = deque(maxlen=max_events or config.STREAM_MAX_EVENTS)
+        self._event_seq = itertools.count(1)
+        self._gate = SceneGate(config.SCENE_MAX_HASH_DISTANCE, config.SCENE_MIN_HIST_CORRELATION)
+        self._last = None
+        self._alert_tags = None  # tags of the ongoing alert, None = calm
+        self.reader = None
+        self.state = RUNNING
+        self.error = None
+        self.started_at = time.time()
+        self.ended_at = None
+        self.frames_analyzed = 0
+        self.frames_skipped = 0
+        self.ticks_missed = 0
+        self.busy_drops = 0
+        self.lag_s = 0.0
+        self.last_risk = 0.0
+        self.last_tags = []
+        self.last_high_risk_at = None
+
+    def rate(self):
+        return self.scheduler.rate_for(self) if self.scheduler else self.fps
+
+    async def run(self):
+        self.reader = FrameReader(self.source, loop=self.loop).start()
+        if self.scheduler:
+            self.scheduler.register(self)
+        next_tick = time.perf_counter()
+        seen = 0
+        try:
+            while self.state == RUNNING:
+                interval = 1.0 / self.rate()
+                next_tick += interval
+                await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+                latest = self.reader.latest()
+                if latest is None or latest[0] == seen:
+                    if self.reader.finished:
+                        break
+                    continue
+                seen, captured_at, frame = latest
+                await self._analyse(downscale(frame, self.max_side), captured_at)
+
+                behind = time.perf_counter() - next_tick
+                if behind > interval:
+                    # analysis took longer than the sampling interval, drop the ticks it covered
+                    missed = int(behind / interval)
+                    self.ticks_missed += missed
+                    next_tick += missed * interval
+            if self.state == RUNNING:
+                self.state = STOPPED
+        except asyncio.CancelledError:
+            self.state = STOPPED
+            raise
+        except Exception as e:
+            self.state = FAILED
+            self.error = str(e)
+        finally:
+            self.ended_at = time.time()
+            self.reader.stop()
+            if self.scheduler:
+                self.scheduler.unregister(self)
+
+    async def _analyse(self, frame, captured_at):
+        if self._last is not None and self._gate.is_repeat(frame, remember=False):
+            self.frames_skipped += 1
+            result = self._last
+        else:
+            try:
+                result = await self.analyse(frame)
+            except PoolFull:
+                # this frame is lost, the next tick gets a fresh one
+                self.busy_drops += 1
+                return
+            # the gate compares with the frame _last belongs to, not one that was dropped
+            self._gate.remember(frame)
+            self._last = result
+        self.frames_analyzed += 1
+        self.lag_s = round(time.time() - captured_at, 3)
+        self._update(result[2], captured_at)
+
+    def _update(self, cls_res, captured_at):
+        risk = cls_res.get("risk_score", 0.0)
+        tags = sorted(cls_res.get("ai_tags", []))
+        self.last_risk = risk
+        self.last_tags = tags
+        if risk >= self.event_risk:
+            self.last_high_risk_at = time.time()
+            # a new alert, or an ongoing one whose tags changed
+            if self._alert_tags != tags:
+                self._emit("risk", risk, tags, cls_res.get("summary", ""), captured_at)
+                self._alert_tags = tags
+        elif self._alert_tags is not None:
+            self._emit("clear", risk, tags, "", captured_at)
+            self._alert_tags = None
+
+    def _emit(self, kind, risk, tags, summary, captured_at):
+        self.events_log.append({
+            "seq": next(self._event_seq),
+            "stream_id": self.id,
+            "type": kind,
+            "time": round(captured_at, 3),
+            "risk_score": round(risk, 3),
+            "ai_tags": tags,
+            "summary": summary,
+        })
+
+    def stop(self):
+        self.state = STOPPED
+        if self.reader is not None:
+            self.reader.stop()
+
+    def events(self, after=0):
+        return [e for e in self.events_log if e["seq"] > after]
+
+    def status(self):
+        reader = self.reader
+        return {
+            "stream_id": self.id,
+            "name": self.name,
+            "source": self.source,
+            "state": self.state,
+            "error": self.error,
+            "fps": self.fps,
+            # what the scheduler currently lets this stream use
+            "allocated_fps": round(self.rate(), 3) if self.state == RUNNING else 0.0,
+            "started_at": self.started_at,
+            "frames_analyzed": self.frames_analyzed,
+            "frames_skipped": self.frames_skipped,
+            "frames_read": reader.frames_read if reader else 0,
+            "frames_dropped": reader.frames_dropped if reader else 0,
+            "ticks_missed": self.ticks_missed,
+            "busy_drops": self.busy_drops,
+            "reconnects": reader.reconnects if reader else 0,
+            "lag_s": self.lag_s,
+            "last_risk": round(self.last_risk, 3),
+            "last_tags": self.last_tags,
+            "alert": self._alert_tags is not None,
+        }
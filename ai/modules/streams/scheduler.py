@@ -0,0 +1,95 @@
+# modules/streams/scheduler.py
+# shares one frames-per-second budget between every watched stream
+import threading
+import time
+from modules import config
+
+
+def share_budget(demands, weights, budget):
+    """
+    Weighted max-min fair split of `budget` over {key: requested fps}.
+    Nobody gets more than they asked for; what a modest stream leaves over is
+    spread across the others in proportion to their weights, so under overload
+    streams of equal weight are cut back by the same factor.
+    """
+    rates = {}
+    open_keys = set(demands)
+    left = budget
+    while open_keys and left > 1e-9:
+        total_weight = sum(weights[k] for k in open_keys)
+        per_weight = left / total_weight
+        # streams whose demand fits their fair share are done, the rest share again
+        satisfied = {k for k in open_keys if demands[k] - rates.get(k, 0.0) <= per_weight * weights[k]}
+        if not satisfied:
+            for k in open_keys:
+                rates[k] = rates.get(k, 0.0) + per_weight * weights[k]
+            break
+        for k in satisfied:
+            left -= demands[k] - rates.get(k, 0.0)
+            rates[k] = demands[k]
+        open_keys -= satisfied
+    for k in demands:
+        rates.setdefault(k, 0.0)
+    return rates
+
+
+class StreamScheduler:
+    """
+    Streams ask for their configured fps, the scheduler hands out at most
+    `budget_fps` in total. A stream that saw a high-risk frame in the last
+    `priority_window_s` weighs `risk_weight` times as much as a calm one.
+    Allocations are recomputed when streams come or go and at most once per
+    `rebalance_s` otherwise, so priority wears off on its own.
+    """
+
+    def __init__(self, budget_fps=None, risk_weight=None, priority_window_s=None, min_fps=None, rebalance_s=1.0):
+        self.budget_fps = config.STREAM_FPS_BUDGET if budget_fps is None else budget_fps
+        self.risk_weight = config.STREAM_RISK_WEIGHT if risk_weight is None else risk_weight
+        self.priority_window_s = config.STREAM_PRIORITY_WINDOW_S if priority_window_s is None else priority_window_s
+        self.min_fps = config.STREAM_MIN_FPS if min_fps is None else min_fps
+        self.rebalance_s = rebalance_s
+        self._monitors = {}
+        self._rates = {}
+        self._balanced_at = 0.0
+        self._lock = threading.Lock()
+
+    def register(self, monitor):
+        with self._lock:
+            self._monitors[monitor.id] = monitor
+            self._rebalance()
+
+    def unregister(self, monitor):
+        with self._lock:
+            self._monitors.pop(monitor.id, None)
+            self._rates.pop(monitor.id, None)
+            self._rebalance()
+
+    def weight(self, monitor, now=None):
+        now = now or time.time()
+        recent = monitor.last_high_risk_at and now - monitor.last_high_risk_at <= self.priority_window_s
+        return self.risk_weight if recent else 1.0
+
+    def _rebalance(self):
+        now = time.time()
+        demands = {k: m.fps for k, m in self._monitors.items()}
+        weights = {k: self.weight(m, now) for k, m in self._monitors.items()}
+        rates = share_budget(demands, weights, self.budget_fps)
+        # a floor keeps every camera looked at now and then, even far over budget
+        self._rates = {k: max(r, min(self.min_fps, demands[k])) for k, r in rates.items()}
+        self._balanced_at = time.perf_counter()
+
+    def rate_for(self, monitor):
+        with self._lock:
+            if time.perf_counter() - self._balanced_at >= self.rebalance_s:
+                self._rebalance()
+            return self._rates.get(monitor.id, monitor.fps)
+
+    def stats(self):
+        with self._lock:
+            demand = sum(m.fps for m in self._monitors.values())
+            return {
+                "budget_fps": self.budget_fps,
+                "demand_fps": round(demand, 3),
+                "allocated_fps": round(sum(self._rates.values()), 3),
+                "streams": {k: round(r, 3) for k, r in self._rates.items()},
+            }
@@ -0,0 +1,132 @@
+# modules/tasks.py
+# entry points the server hands to the inference pool.
+# everything here is blocking and runs inside a pool worker.
+import os
+import time
+import numpy as np
+from modules.detector.load import get_models
+from modules.detector.detect import detect_image, detect_images
+from modules.classifier.classify import classify
+from modules.utils.video import process_video, analyze_frames, frame_event
+from modules.utils.ocr import ocr_image, ocr_images, get_reader
+from modules.utils.preprocess import decode_image
+from modules.manifesto.extract import extract_text_from_pdf
+from modules.manifesto.compare import compare_texts_simple
+from modules.jobs.store import progress_reporter
+from modules.utils.metrics import stage
+from modules.utils.memory import process_memory
+from modules.utils.budget import Budget, use_budget
+
+def init_worker(reports=None):
+    # load and warm up the models when the worker starts instead of on its first
+    # request, then tell the server on `reports` that this worker is ready
+    try:
+        report = warm_up()
+    except Exception as e:
+        if reports is not None:
+            reports.put({"pid": os.getpid(), "error": str(e)})
+        raise
+    if reports is not None:
+        reports.put(report)
+
+def ping():
+    # no-op task, makes the pool start a worker
+    return os.getpid()
+
+def warm_up():
+    # load every model and push a dummy input through it, so the first real
+    # request doesn't pay for lazy init (torch kernels, easyocr recognizer...)
+    started = time.perf_counter()
+    flag_model, person_model = get_models()
+    get_reader()
+    # reasoning model goes here once modules/reasoning has one
+    loaded = time.perf_counter()
+
+    dummy = np.zeros((640, 640, 3), dtype=np.uint8)
+    detect_image(dummy, flag_model, person_model)
+    ocr_image(dummy)
+    done = time.perf_counter()
+
+    return {
+        "pid": os.getpid(),
+        "load_s": round(loaded - started, 3),
+        "warmup_s": round(done - loaded, 3),
+        "memory": process_memory(),
+    }
+
+def analyze_video(file_path, job=None, budget=None):
+    # job: optional (jobs db path, job id) to report progress to
+    # budget: optional Budget params (see budget_params), limits how much gets analysed
+    flag_model, person_model = get_models()
+    progress = progress_reporter(*job) if job else None
+    return process_video(file_path, flag_model, person_model, classify, progress=progress,
+                         budget=Budget.from_params(budget))
+
+def analyze_frame(frame):
+    # one live stream frame (BGR array): (detect, ocr, classification)
+    flag_model, person_model = get_models()
+    return analyze_frames([frame], flag_model, person_model)[0]
+
+def analyze_video_events(file_path, events, cancel, budget=None):
+    # events: queue the server streams one event per analysed frame from
+    # cancel: set by the server once the client has gone away
+    flag_model, person_model = get_models()
+    return process_video(file_path, flag_model, person_model, classify,
+                         on_frame=lambda entry: events.put(frame_event(entry)), cancel=cancel,
+                         budget=Budget.from_params(budget))
+
+def image_stages(data, run_detect=True, run_ocr=True):
+    # only the stages the cache couldn't answer
+    flag_model, person_model = get_models()
+
+    # decode once, detectors and OCR all read the same pixels
+    with stage("decode"):
+        image = decode_image(data)
+    return {
+        "detect": detect_image(image, flag_model, person_model) if run_detect else None,
+        "ocr": ocr_image(image) if run_ocr else None,
+    }
+
+def images_stages(datas):
+    # a whole report's images: decode each once, then detect and OCR them as batches
+    flag_model, person_model = get_models()
+    out = [None] * len(datas)
+    images, positions = [], []
+    for i, data in enumerate(datas):
+        try:
+            with stage("decode"):
+                images.append(decode_image(data))
+            positions.append(i)
+        except ValueError as e:
+            # one broken upload shouldn't sink the rest of the report
+            out[i] = {"error": str(e)}
+
+    detections = detect_images(images, flag_model, person_model)
+    ocr_results = ocr_images(images) if images else []
+    for i, d, o in zip(positions, detections, ocr_results):
+        out[i] = {"detect": d, "ocr": o}
+    return out
+
+def build_image_response(detect_results, ocr_results, classified_results):
+    return {
+        "ai_tags": classified_results.get('ai_tags'),
+        "risk_score": classified_results.get('risk_score'),
+        "summary": classified_results.get('summary'),
+        "objects": detect_results,
+        "ocr": ocr_results
+    }
+
+def compare_manifestos(path_a, path_b, budget=None):
+    # budget: optional Budget params, max_ms / max_ocr_calls bound the page-by-page OCR of both files
+    budget = Budget.from_params(budget)
+    with use_budget(budget):
+        # Extract text from PDFs (with OCR fallback)
+        text_a = extract_text_from_pdf(path_a)
+        text_b = extract_text_from_pdf(path_b)
+
+    with stage("tfidf_compare"):
+        result = compare_texts_simple(text_a, text_b)
+    if budget is not None:
+        result["partial"] = budget.partial
+        result["budget"] = budget.report()
+    return result
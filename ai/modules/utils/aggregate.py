@@ -0,0 +1,160 @@
+# modules/utils/aggregate.py
+# online summary of a video's analysed frames, its size doesn't grow with the clip length
+import random
+from array import array
+
+_EMPTY = -1.0  # timeline bucket without any sampled frame
+
+
+def _normalise(line):
+    return " ".join(line.lower().split())
+
+
+class VideoAggregator:
+    """
+    Takes (index, timestamp, detect, ocr, classification, reused) entries one at a
+    time, in any order, and keeps only:
+      - the weighted running risk average and per-tag frame counts
+      - a per-bucket max risk timeline in a float array; once it would pass
+        `max_points` the buckets double in length, so it never grows beyond that
+      - a reservoir sample of `examples` frames' detections
+      - up to `max_ocr_lines` distinct OCR lines
+    Aggregators of separate segments combine with merge().
+    """
+
+    def __init__(self, bucket_s=1.0, max_points=600, examples=10, max_ocr_lines=200, seed=0):
+        self.bucket_s = bucket_s
+        self.max_points = max_points
+        self.examples = examples
+        self.max_ocr_lines = max_ocr_lines
+        self.frames = 0
+        self.skipped = 0
+        self.weight_total = 0.0
+        self.risk_total = 0.0
+        self.tag_counts = {}
+        self.timeline = array("f")
+        self.reservoir = []  # (frame index, detections)
+        self.fresh = 0  # analysed (not reused) frames offered to the reservoir
+        self.ocr_lines = {}  # normalised -> as first seen
+        self.ocr_dropped = 0
+        self._random = random.Random(seed)
+
+    def add(self, entry, weight=1.0):
+        index, timestamp, detect_results, ocr_res, cls_res, reused = entry
+        risk = cls_res.get("risk_score", 0.0)
+        self.frames += 1
+        self.weight_total += weight
+        self.risk_total += risk * weight
+        for tag in cls_res.get("ai_tags", []):
+            self.tag_counts[tag] = self.tag_counts.get(tag, 0) + 1
+        self._mark(timestamp, risk)
+
+        if reused:
+            # same detections / text as an earlier frame, nothing new to keep
+            self.skipped += 1
+            return
+        self._sample(index, detect_results)
+        self._add_ocr(ocr_res)
+
+    def _mark(self, timestamp, risk):
+        slot = int(timestamp / self.bucket_s)
+        while slot >= self.max_points:
+            self._coarsen()
+            slot = int(timestamp / self.bucket_s)
+        if slot >= len(self.timeline):
+            self.timeline.extend([_EMPTY] * (slot + 1 - len(self.timeline)))
+        self.timeline[slot] = max(self.timeline[slot], risk)
+
+    def _coarsen(self):
+        old = self.timeline
+        self.timeline = array("f", (max(old[i:i + 2]) for i in range(0, len(old), 2)))
+        self.bucket_s *= 2
+
+    def _sample(self, index, detect_results):
+        # algorithm R: every fresh frame ends up in the sample with equal probability
+        self.fresh += 1
+        if len(self.reservoir) < self.examples:
+            self.reservoir.append((index, detect_results))
+            return
+        slot = self._random.randrange(self.fresh)
+        if slot < self.examples:
+            self.reservoir[slot] = (index, detect_results)
+
+    def _add_ocr(self, ocr_res):
+        segments = ocr_res.get("segments") or []
+        lines = [s.get("text", "") for s in segments] if segments else (ocr_res.get("text") or "").splitlines()
+        for line in lines:
+            key = _normalise(line)
+            if not key or key in self.ocr_lines:
+                continue
+            if len(self.ocr_lines) >= self.max_ocr_lines:
+                self.ocr_dropped += 1
+                continue
+            self.ocr_lines[key] = " ".join(line.split())
+
+    def merge(self, other):
+        self.frames += other.frames
+        self.skipped += other.skipped
+        self.weight_total += other.weight_total
+        self.risk_total += other.risk_total
+        for tag, count in other.tag_counts.items():
+            self.tag_counts[tag] = self.tag_counts.get(tag, 0) + count
+
+        theirs = other.timeline
+        bucket_s = other.bucket_s
+        while self.bucket_s < bucket_s:
+            self._coarsen()
+        while bucket_s < self.bucket_s:
+            theirs = array("f", (max(theirs[i:i + 2]) for i in range(0, len(theirs), 2)))
+            bucket_s *= 2
+        if len(theirs) > len(self.timeline):
+            self.timeline.extend([_EMPTY] * (len(theirs) - len(self.timeline)))
+        for slot, risk in enumerate(theirs):
+            self.timeline[slot] = max(self.timeline[slot], risk)
+        while len(self.timeline) > self.max_points:
+            self._coarsen()
+
+        # draw the combined sample from both sides in proportion to what each saw
+        mine, theirs_sample = list(self.reservoir), list(other.reservoir)
+        seen_mine, seen_theirs = self.fresh, other.fresh
+        combined = []
+        while len(combined) < self.examples and (mine or theirs_sample):
+            pick_mine = theirs_sample == [] or (
+                mine and self._random.random() < seen_mine / max(seen_mine + seen_theirs, 1)
+            )
+            if pick_mine:
+                combined.append(mine.pop(self._random.randrange(len(mine))))
+            else:
+                combined.append(theirs_sample.pop(self._random.randrange(len(theirs_sample))))
+        self.reservoir = combined
+        self.fresh += other.fresh
+
+        for key, line in other.ocr_lines.items():
+            if key in self.ocr_lines:
+                continue
+            if len(self.ocr_lines) >= self.max_ocr_lines:
+                self.ocr_dropped += 1
+                continue
+            self.ocr_lines[key] = line
+        self.ocr_dropped += other.ocr_dropped
+        return self
+
+    def result(self):
+        avg_score = self.risk_total / self.weight_total if self.weight_total else 0.0
+        tags = list(self.tag_counts)
+        return {
+            "risk_score": round(avg_score, 2),
+            "ai_tags": tags,
+            "summary": " | ".join(tags),
+            "reasons": [f"Detected '{t}' in multiple frames" for t in tags],
+            "tag_counts": dict(self.tag_counts),
+            "ocr_text": "\n".join(self.ocr_lines.values()),
+            # example frames' detections, in time order
+            "detections": [d for _, d in sorted(self.reservoir, key=lambda item: item[0])],
+            "frames_analyzed": self.frames,
+            "frames_skipped": self.skipped,
+            "timeline": {
+                "bucket_s": self.bucket_s,
+                "max_risk": [None if r == _EMPTY else round(r, 3) for r in self.timeline],
+            },
+        }
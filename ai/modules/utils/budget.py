@@ -0,0 +1,118 @@
+# modules/utils/budget.py
+# per-request limits on how much work an analysis may do before it answers with what it has
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+_current = contextvars.ContextVar("analysis_budget", default=None)
+
+
+class BudgetExhausted(Exception):
+    pass
+
+
+class Budget:
+    """
+    Limits for one analysis, 0 = no limit:
+      max_ms         wall time since the budget was created (inside the worker)
+      max_frames     analysed video frames
+      max_ocr_calls  frames / pages sent to OCR, past it analysis goes on without OCR
+      stop_risk      stop as soon as one frame's risk (0..1) reaches this
+    check() before each unit of work raises BudgetExhausted and remembers why, so a
+    limit hit on the very last frame doesn't mark a complete result as partial.
+    report() goes in the response.
+    """
+
+    def __init__(self, max_ms=0, max_frames=0, max_ocr_calls=0, stop_risk=0.0):
+        self.max_ms = max_ms
+        self.max_frames = max_frames
+        self.max_ocr_calls = max_ocr_calls
+        self.stop_risk = stop_risk
+        self.started = time.perf_counter()
+        self.frames = 0
+        self.ocr_calls = 0
+        self.ocr_skipped = 0
+        self.stopped_by = None
+        self._risk_reached = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_params(cls, params):
+        # params travel to pool workers as a plain dict
+        return cls(**params) if params else None
+
+    @property
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def check(self):
+        reason = None
+        if self._risk_reached:
+            reason = "stop_risk"
+        elif self.max_frames and self.frames >= self.max_frames:
+            reason = "max_frames"
+        elif self.max_ms and self.elapsed_ms >= self.max_ms:
+            reason = "max_ms"
+        if reason:
+            self.stopped_by = reason
+            raise BudgetExhausted(reason)
+
+    def take_frame(self, risk=None):
+        self.frames += 1
+        if self.stop_risk and risk is not None and risk >= self.stop_risk:
+            self._risk_reached = True
+
+    def take_ocr(self, n=1):
+        # how many of the next n OCR calls may still run
+        with self._lock:
+            allowed = n
+            if self.max_ocr_calls:
+                allowed = max(0, min(n, self.max_ocr_calls - self.ocr_calls))
+            self.ocr_calls += allowed
+            self.ocr_skipped += n - allowed
+            return allowed
+
+    @property
+    def partial(self):
+        return self.stopped_by is not None or self.ocr_skipped > 0
+
+    def report(self):
+        return {
+            "stopped_by": self.stopped_by,
+            "elapsed_ms": round(self.elapsed_ms, 2),
+            "frames": self.frames,
+            "ocr_calls": self.ocr_calls,
+            "ocr_skipped": self.ocr_skipped,
+            "limits": {
+                "max_ms": self.max_ms,
+                "max_frames": self.max_frames,
+                "max_ocr_calls": self.max_ocr_calls,
+                "stop_risk": self.stop_risk,
+            },
+        }
+
+
+@contextmanager
+def use_budget(budget):
+    """Make `budget` the one stages like OCR draw on inside the block (pipeline threads included)."""
+    token = _current.set(budget)
+    try:
+        yield budget
+    finally:
+        _current.reset(token)
+
+
+def current_budget():
+    return _current.get()
+
+
+def budget_params(max_ms=None, max_frames=None, max_ocr_calls=None, stop_risk=None, defaults=None):
+    # request values over the server defaults, None when nothing is limited
+    params = dict(defaults or {})
+    for name, value in (("max_ms", max_ms), ("max_frames", max_frames),
+                        ("max_ocr_calls", max_ocr_calls), ("stop_risk", stop_risk)):
+        if value is not None:
+            params[name] = value
+    params = {k: v for k, v in params.items() if v}
+    return params or None
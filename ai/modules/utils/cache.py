@@ -0,0 +1,77 @@
+# modules/utils/cache.py
+# content-addressed result cache, one entry per (stage, version, sha256 of upload)
+import hashlib
+import pickle
+import threading
+from collections import OrderedDict
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class LRUCache:
+    """
+    Least-recently-used cache bounded by total (pickled) size and entry count.
+    Keys are (stage, version, digest) tuples, hits/misses are counted per stage.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, max_entries=2048):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.bytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._misses = {}
+        self.evictions = 0
+
+    def get(self, key):
+        stage = key[0]
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._misses[stage] = self._misses.get(stage, 0) + 1
+                return None
+            self._data.move_to_end(key)
+            self._hits[stage] = self._hits.get(stage, 0) + 1
+            return entry[0]
+
+    def put(self, key, value):
+        try:
+            size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._data[key] = (value, size)
+            self.bytes += size
+
+            while self._data and (self.bytes > self.max_bytes or len(self._data) > self.max_entries):
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            stages = {}
+            for stage in set(self._hits) | set(self._misses):
+                hits = self._hits.get(stage, 0)
+                misses = self._misses.get(stage, 0)
+                stages[stage] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_ratio": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+                }
+            return {
+                "entries": len(self._data),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                "stages": stages,
+            }
@@ -0,0 +1,42 @@
+# modules/utils/memory.py
+# process memory, split into shared and private pages where linux tells us
+import os
+
+
+def _peak_rss():
+    try:
+        import resource  # unix only
+    except ImportError:
+        return {}
+    return {"rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+
+
+def process_memory(pid=None):
+    """
+    rss / pss / shared / private in MB. pss (proportional set size) is the fair
+    share of pages shared with other processes, the number to compare when
+    workers share model weights copy-on-write.
+    """
+    path = f"/proc/{pid or 'self'}/smaps_rollup"
+    fields = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])  # kB
+    except OSError:
+        # not linux (or no smaps_rollup), peak rss is all we get, where there is one
+        if pid is None or pid == os.getpid():
+            return _peak_rss()
+        return {}
+
+    def mb(*names):
+        return round(sum(fields.get(n, 0) for n in names) / 1024, 1)
+
+    return {
+        "rss_mb": mb("Rss"),
+        "pss_mb": mb("Pss"),
+        "shared_mb": mb("Shared_Clean", "Shared_Dirty"),
+        "private_mb": mb("Private_Clean", "Private_Dirty"),
+    }
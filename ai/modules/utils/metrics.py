@@ -0,0 +1,179 @@
+# modules/utils/metrics.py
+# minimal prometheus text-format metrics plus per-stage timing.
+#
+# stage() times a block of work. inside a pool worker the timings are collected
+# per call (timed_call) and shipped back with the result, so the server process
+# can export them even when the work ran in another process.
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# seconds, from a fast decode up to a long video
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_registry = []
+_lock = threading.Lock()
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for k, v in sorted(labels.items()):
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{k}="{v}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(v):
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with _lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(dict(key))} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with _lock:
+            for key, series in self._series.items():
+                labels = dict(key)
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': bound})} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series[-2])}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {series[-1]}")
+        return lines
+
+
+class GaugeFunc:
+    """Gauge read at scrape time, fn returns [(labels dict, value)]."""
+
+    def __init__(self, name, help_text, fn):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+        _registry.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            samples = self.fn()
+        except Exception:
+            samples = []
+        for labels, value in samples:
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+def render():
+    lines = []
+    for metric in list(_registry):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram("ai_stage_seconds", "Latency of each analysis stage")
+FRAMES_PER_VIDEO = Histogram(
+    "ai_video_frames_analyzed", "Frames analysed per video",
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1200, 3600),
+)
+REJECTED = Counter("ai_requests_rejected_total", "Requests turned away because the inference queue was full")
+
+
+# ---- stage timing ----
+
+_timings = contextvars.ContextVar("stage_timings", default=None)
+
+
+def record_stage(name, seconds):
+    STAGE_SECONDS.observe(seconds, stage=name)
+    timings = _timings.get()
+    if timings is not None:
+        timings.setdefault(name, []).append(seconds)
+
+
+@contextmanager
+def stage(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+@contextmanager
+def collect_timings():
+    """Collect every stage() inside the block into a {stage: [seconds, ...]} dict."""
+    timings = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def merge_timings(timings):
+    # fold timings collected elsewhere (a pool worker) into the current collector
+    current = _timings.get()
+    if current is None:
+        return
+    for name, values in timings.items():
+        current.setdefault(name, []).extend(values)
+
+
+def summarize_timings(timings):
+    # {stage: total milliseconds} for a response
+    return {name: round(sum(values) * 1000, 2) for name, values in timings.items()}
+
+
+def timed_call(fn, submitted_at, profile_dir, *args):
+    # runs inside the pool worker, the wall clock is shared with the server process
+    profile_path = None
+    with collect_timings() as timings:
+        timings["queue_wait"] = [max(0.0, time.time() - submitted_at)]
+        if profile_dir:
+            from modules.utils.profiling import run_profiled
+            result, profile_path = run_profiled(fn, args, profile_dir)
+        else:
+            result = fn(*args)
+    return result, timings, profile_path
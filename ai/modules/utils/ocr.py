@@ -1,41 +1,74 @@
 # modules/utils/ocr.py
 import easyocr
 import os
+import threading
+import numpy as np
 from PIL import Image
+from modules.utils.preprocess import bgr_to_rgb
+from modules.utils.metrics import stage
 
-#avoid reload model again again single reader
-_reader = None
+#avoid reload model again again single reader (slot 0), pipeline OCR workers
+#past the first get a reader of their own in another slot
+_readers = {}
+_reader_lock = threading.Lock()
+# a Reader isn't safe to call from two threads (thread backend workers share
+# one), each slot's calls take turns on its own lock
+_call_locks = {}
 
-def get_reader(device='cpu', lang_list=None):
-    global _reader
-    if _reader is None:
-        # ne en
-        if lang_list is None:
-            lang_list = ['ne', 'en']
-        _reader = easyocr.Reader(lang_list, gpu=False)
-    return _reader
+def get_reader(device='cpu', lang_list=None, slot=0):
+    reader = _readers.get(slot)
+    if reader is None:
+        with _reader_lock:
+            reader = _readers.get(slot)
+            if reader is None:
+                # ne en
+                if lang_list is None:
+                    lang_list = ['ne', 'en']
+                _call_locks[slot] = threading.Lock()
+                reader = _readers[slot] = easyocr.Reader(lang_list, gpu=False)
+    return reader
 
-def ocr_image(image_path, lang_list=None, rotate=False):
+def _to_rgb(image):
+    # image is a file path or an already decoded BGR array
+    if isinstance(image, np.ndarray):
+        return bgr_to_rgb(image)
+    return __pil_to_np(Image.open(image).convert('RGB'))
+
+def ocr_image(image, lang_list=None, rotate=False):
     reader = get_reader(lang_list=lang_list)
-    img = Image.open(image_path).convert('RGB')
-    img_np = __pil_to_np(img)
+    img_np = _to_rgb(image)
+
+    with _call_locks[0], stage("ocr"):
+        results = reader.readtext(img_np)
+        if not results and rotate:
+            # same as PIL rotate(90, expand=True)
+            results = reader.readtext(np.ascontiguousarray(np.rot90(img_np)))
+
+    return _format_results(results)
 
-    results = reader.readtext(img_np)
-    if not results and rotate:
-        img_rot = img.rotate(90, expand=True)
-        results = reader.readtext(__pil_to_np(img_rot))
+def ocr_images(images, lang_list=None, slot=0):
+    # several images in one go, easyocr can only batch them when they share a size
+    reader = get_reader(lang_list=lang_list, slot=slot)
+    rgb = [_to_rgb(image) for image in images]
+    with _call_locks[slot], stage("ocr"):
+        if len(rgb) > 1 and len({img.shape for img in rgb}) == 1:
+            batch_results = reader.readtext_batched(rgb, batch_size=len(rgb))
+        else:
+            batch_results = [reader.readtext(img) for img in rgb]
+    return [_format_results(results) for results in batch_results]
 
+def _format_results(results):
     texts = [res[1] for res in results if len(res) > 1]
     full_text = " ".join(texts).strip()
     return {
         "text": full_text,
         "segments": [
-            {"bbox": res[0], "text": res[1], "confidence": float(res[2])}
+            # easyocr hands back numpy ints in the box, keep the response plain python
+            {"bbox": [[float(x), float(y)] for x, y in res[0]], "text": res[1], "confidence": round(float(res[2]), 4)}
             for res in results
         ]
     }
 
 def __pil_to_np(pil_img):
     """Convert PIL image to numpy array (RGB) for easyocr"""
-    import numpy as np
     return np.array(pil_img)
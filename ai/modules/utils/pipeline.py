@@ -0,0 +1,183 @@
+# modules/utils/pipeline.py
+# staged thread pipeline: a source thread and worker stages connected by bounded
+# queues, so decode, detection and OCR of different batches overlap
+import contextvars
+import queue
+import threading
+import time
+
+_DONE = object()
+_worker = contextvars.ContextVar("pipeline_worker", default=0)
+
+
+class _Failed:
+    def __init__(self, error):
+        self.error = error
+
+
+class Stage:
+    def __init__(self, name, fn, workers=1):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+
+
+class Pipeline:
+    """
+    source -> stage -> stage ... -> caller. Every item gets a sequence number at
+    the source and run() yields the results back in source order, whichever
+    worker finished first. Queues are bounded, so a fast decoder can only run
+    `queue_size` items ahead of the slowest stage.
+    Stage code runs in a copy of the caller's context, stage() timings land in
+    the request's collector as usual.
+    """
+
+    def __init__(self, source, stages, queue_size=2, source_name="decode"):
+        self.source = source
+        self.source_name = source_name
+        self.stages = stages
+        self.queue_size = queue_size
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._busy = {source_name: 0.0, **{s.name: 0.0 for s in stages}}
+        self._items = {name: 0 for name in self._busy}
+        self._wall = 0.0
+
+    def _put(self, q, item):
+        # gives up once the consumer has gone away, so no thread stays blocked
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _account(self, name, seconds):
+        with self._lock:
+            self._busy[name] += seconds
+            self._items[name] += 1
+
+    def _run_source(self, out):
+        seq = 0
+        try:
+            iterator = iter(self.source)
+            while not self._stop.is_set():
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                self._account(self.source_name, time.perf_counter() - started)
+                if not self._put(out, (seq, item)):
+                    return
+                seq += 1
+        except Exception as e:
+            self._put(out, (seq, _Failed(e)))
+        self._put(out, _DONE)
+
+    def _run_stage(self, stage, worker, inbox, out, remaining):
+        _worker.set(worker)
+        while not self._stop.is_set():
+            try:
+                item = inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                # let the sibling workers see it too, the last one passes it on
+                self._put(inbox, _DONE)
+                with self._lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    self._put(out, _DONE)
+                return
+            seq, value = item
+            if not isinstance(value, _Failed):
+                started = time.perf_counter()
+                try:
+                    value = stage.fn(value)
+                except Exception as e:
+                    value = _Failed(e)
+                self._account(stage.name, time.perf_counter() - started)
+            if not self._put(out, (seq, value)):
+                return
+
+    def run(self):
+        queues = [queue.Queue(self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(
+            target=contextvars.copy_context().run, args=(self._run_source, queues[0]),
+            name=f"pipeline-{self.source_name}", daemon=True,
+        )]
+        for i, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            for w in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=contextvars.copy_context().run,
+                    args=(self._run_stage, stage, w, queues[i], queues[i + 1], remaining),
+                    name=f"pipeline-{stage.name}-{w}", daemon=True,
+                ))
+
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        try:
+            results = queues[-1]
+            pending = {}
+            expected = 0
+            while True:
+                item = results.get()
+                if item is _DONE:
+                    break
+                seq, value = item
+                pending[seq] = value
+                while expected in pending:
+                    value = pending.pop(expected)
+                    if isinstance(value, _Failed):
+                        raise value.error
+                    yield value
+                    expected += 1
+        finally:
+            # normal end, an error, or the caller closing the generator early:
+            # wait for every stage to let go of the models before returning
+            self._stop.set()
+            for t in threads:
+                t.join()
+            self._wall = time.perf_counter() - started
+
+    def stats(self):
+        workers = {self.source_name: 1, **{s.name: s.workers for s in self.stages}}
+        with self._lock:
+            return {
+                name: {
+                    "workers": workers[name],
+                    "items": self._items[name],
+                    "busy_s": round(self._busy[name], 3),
+                    "wall_s": round(self._wall, 3),
+                }
+                for name in self._busy
+            }
+
+
+def current_worker():
+    # index of the stage worker running the calling code, 0 outside a pipeline
+    return _worker.get()
+
+
+def add_stats(total, stats):
+    # sum the stats of several pipeline runs (adaptive sampling runs one per window)
+    for name, s in stats.items():
+        t = total.setdefault(name, {"workers": s["workers"], "items": 0, "busy_s": 0.0, "wall_s": 0.0})
+        t["items"] += s["items"]
+        t["busy_s"] = round(t["busy_s"] + s["busy_s"], 3)
+        t["wall_s"] = round(t["wall_s"] + s["wall_s"], 3)
+    return total
+
+
+def utilisation(stats):
+    # busy share of each stage's worker time, 1.0 = the stage never waited
+    out = {}
+    for name, s in stats.items():
+        capacity = s["wall_s"] * s["workers"]
+        out[name] = {**s, "utilisation": round(s["busy_s"] / capacity, 3) if capacity else 0.0}
+    return out
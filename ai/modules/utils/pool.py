@@ -0,0 +1,99 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from modules.utils.metrics import STAGE_SECONDS, timed_call, merge_timings
+from modules.utils.profiling import profile_dir, add_profile_file
+
+
+class PoolFull(Exception):
+    pass
+
+
+class InferencePool:
+    """
+    Runs blocking inference off the event loop.
+    At most `workers` jobs run at once and at most `queue_size` more may wait,
+    anything beyond that is rejected with PoolFull so the caller can shed load.
+    """
+
+    def __init__(self, workers=2, queue_size=8, backend="process", initializer=None, initargs=()):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.backend = backend
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+        if backend == "thread":
+            self._executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="inference",
+                initializer=initializer, initargs=initargs,
+            )
+        else:
+            # spawn so workers don't inherit the server's threads / torch state
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=initializer,
+                initargs=initargs,
+            )
+
+    @property
+    def capacity(self):
+        return self.workers + self.queue_size
+
+    @property
+    def queued(self):
+        return max(0, self.in_flight - self.workers)
+
+    def has_room(self, n=1):
+        # whether n more calls would be accepted right now
+        with self._lock:
+            return self.in_flight + n <= self.capacity
+
+    def _release(self, _future):
+        with self._lock:
+            self.in_flight -= 1
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                raise PoolFull()
+            self.in_flight += 1
+
+        try:
+            future = self._executor.submit(timed_call, fn, time.time(), profile_dir(), *args)
+        except Exception:
+            with self._lock:
+                self.in_flight -= 1
+            raise
+
+        # release the slot when the work really finishes, not when the client goes away
+        future.add_done_callback(self._release)
+        result, timings, profile_path = await asyncio.wrap_future(future)
+        self._export(timings)
+        add_profile_file(profile_path)
+        return result
+
+    def _export(self, timings):
+        # a worker process has its own metrics, bring its stage timings over here.
+        # thread workers already recorded into this process, except the queue wait
+        for name, values in timings.items():
+            if self.backend == "process" or name == "queue_wait":
+                for seconds in values:
+                    STAGE_SECONDS.observe(seconds, stage=name)
+        # and into the calling request's own breakdown
+        merge_timings(timings)
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "capacity": self.capacity,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
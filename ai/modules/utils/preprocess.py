@@ -0,0 +1,30 @@
+# modules/utils/preprocess.py
+# decode an upload once and hand the same pixels to every stage
+import io
+import cv2
+import numpy as np
+
+def decode_image(data):
+    """Decode encoded image bytes into a BGR numpy array (OpenCV / ultralytics layout)."""
+    buf = np.frombuffer(data, dtype=np.uint8)
+    img = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+    if img is not None:
+        return img
+
+    # formats opencv can't read (gif, some tiff...) go through PIL
+    from PIL import Image
+    try:
+        pil_img = Image.open(io.BytesIO(data)).convert('RGB')
+    except Exception:
+        raise ValueError("Uploaded file is not a readable image")
+    return cv2.cvtColor(np.asarray(pil_img), cv2.COLOR_RGB2BGR)
+
+def bgr_to_rgb(img):
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+def downscale(frame, max_side):
+    h, w = frame.shape[:2]
+    scale = max_side / max(h, w)
+    if scale >= 1:
+        return frame
+    return cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
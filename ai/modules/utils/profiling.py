@@ -0,0 +1,71 @@
+# modules/utils/profiling.py
+# on-demand profile of a single request. the request marks itself as profiled,
+# every pool call it makes then runs under a profiler inside the worker and the
+# profile lands in a file next to the others.
+import contextvars
+import cProfile
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    from pyinstrument import Profiler  # sampling profiler, preferred when installed
+except ImportError:
+    Profiler = None
+
+_profile_request = contextvars.ContextVar("profile_request", default=None)
+
+
+@contextmanager
+def profile_request(directory):
+    """Mark the current request as profiled, profiles go to `directory`. None disables."""
+    if not directory:
+        yield None
+        return
+    request = {"dir": directory, "files": []}
+    token = _profile_request.set(request)
+    try:
+        yield request
+    finally:
+        _profile_request.reset(token)
+
+
+def profile_dir():
+    request = _profile_request.get()
+    return request["dir"] if request else None
+
+
+def add_profile_file(path):
+    request = _profile_request.get()
+    if request is not None and path:
+        request["files"].append(path)
+
+
+def run_profiled(fn, args, directory):
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(
+        directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{getattr(fn, '__name__', 'call')}"
+    )
+
+    if Profiler is not None:
+        profiler = Profiler(interval=0.001)
+        profiler.start()
+        try:
+            result = fn(*args)
+        finally:
+            profiler.stop()
+            path = base + ".html"
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+        return result, path
+
+    # stdlib fallback, deterministic rather than sampling but always available
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = fn(*args)
+    finally:
+        profiler.disable()
+        path = base + ".prof"
+        profiler.dump_stats(path)
+    return result, path
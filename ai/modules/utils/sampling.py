@@ -0,0 +1,144 @@
+# modules/utils/sampling.py
+# picks which video frames get analysed, and decodes as few of the others as possible
+import time
+import cv2
+from modules.utils.metrics import record_stage
+
+try:
+    import av  # PyAV, needed for keyframe-only decode
+except ImportError:
+    av = None
+
+INTERVAL = "interval"
+BUDGET = "budget"
+KEYFRAMES = "keyframes"
+
+# gaps longer than this are crossed with a seek instead of grab()-ing frame by frame
+SEEK_THRESHOLD = 90
+
+
+def video_info(cap):
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    if fps <= 0 or fps > 1000:  # broken containers report 0 or nonsense
+        fps = 30.0
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    return {
+        "fps": round(fps, 3),
+        "frame_count": frame_count,
+        "duration_s": round(frame_count / fps, 3) if frame_count > 0 else None,
+    }
+
+
+def _skip(cap, position, target):
+    # move the capture from `position` to `target` without decoding what's in between
+    gap = target - position
+    if gap <= 0:
+        return position
+    if gap > SEEK_THRESHOLD:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        return target
+    for _ in range(gap):
+        if not cap.grab():
+            return -1
+    return target
+
+
+def _targets(mode, info, every_s, budget, start_frame=0, end_frame=None):
+    fps = info["fps"]
+    last = end_frame if end_frame is not None else info["frame_count"]
+    if mode == BUDGET and budget and last > start_frame:
+        # K frames spread uniformly, each in the middle of its slice of the clip
+        span = last - start_frame
+        k = min(budget, span)
+        return [start_frame + int((i + 0.5) * span / k) for i in range(k)]
+
+    step = max(1, int(round(fps * every_s)))
+    if last > 0:
+        return range(start_frame, last, step)
+    # unknown length (some streams / broken headers): keep stepping until the end
+    return _endless(start_frame, step)
+
+
+def _endless(start, step):
+    position = start
+    while True:
+        yield position
+        position += step
+
+
+def sample_opencv(video_path, mode=INTERVAL, every_s=1.0, budget=None, start_frame=0, end_frame=None):
+    """Yield (frame_index, timestamp_s, frame) for the chosen frames, decoding only those."""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        info = video_info(cap)
+        if start_frame:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        position = start_frame
+
+        started = time.perf_counter()
+        for target in _targets(mode, info, every_s, budget, start_frame, end_frame):
+            position = _skip(cap, position, target)
+            if position < 0:
+                break
+            ret, frame = cap.read()
+            if not ret:
+                break
+            position += 1
+            record_stage("video_decode", time.perf_counter() - started)
+            yield target, target / info["fps"], frame
+            started = time.perf_counter()
+    finally:
+        cap.release()
+
+
+def sample_keyframes(video_path, every_s=1.0, start_s=0.0, end_s=None):
+    """
+    Keyframe-only decode through PyAV: the decoder skips every non-key frame,
+    so cost follows the GOP count rather than the frame count.
+    Keyframes closer than `every_s` to the previous one are dropped.
+    """
+    with av.open(video_path) as container:
+        stream = container.streams.video[0]
+        stream.codec_context.skip_frame = "NONKEY"
+        fps = float(stream.average_rate or 30)
+        if start_s:
+            container.seek(int(start_s / stream.time_base), stream=stream, backward=True)
+
+        last_ts = None
+        started = time.perf_counter()
+        for frame in container.decode(stream):
+            ts = float(frame.pts * stream.time_base) if frame.pts is not None else 0.0
+            if ts < start_s:
+                continue
+            if end_s is not None and ts >= end_s:
+                break
+            if last_ts is not None and ts - last_ts < every_s:
+                continue
+            last_ts = ts
+            image = frame.to_ndarray(format="bgr24")
+            record_stage("video_decode", time.perf_counter() - started)
+            yield int(round(ts * fps)), ts, image
+            started = time.perf_counter()
+
+
+def sample_frames(video_path, mode=INTERVAL, every_s=1.0, budget=None, start_frame=0, end_frame=None):
+    if mode == KEYFRAMES:
+        if av is not None:
+            fps = video_fps(video_path)
+            end_s = end_frame / fps if end_frame is not None else None
+            return sample_keyframes(video_path, every_s, start_s=start_frame / fps, end_s=end_s)
+        print("PyAV not installed, keyframe sampling falls back to interval")
+        mode = INTERVAL
+    return sample_opencv(video_path, mode, every_s, budget, start_frame, end_frame)
+
+
+def probe(video_path):
+    cap = cv2.VideoCapture(video_path)
+    try:
+        return video_info(cap)
+    finally:
+        cap.release()
+
+
+def video_fps(video_path):
+    return probe(video_path)["fps"]
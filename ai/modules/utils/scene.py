@@ -0,0 +1,54 @@
+# modules/utils/scene.py
+# cheap "has anything changed?" check between sampled video frames
+import cv2
+import numpy as np
+
+
+def dhash(frame, size=8):
+    # difference hash: 64 bits describing the brightness gradients of a tiny thumbnail
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def color_hist(frame, bins=16):
+    small = cv2.resize(frame, (64, 64), interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    hist = cv2.calcHist([hsv], [0, 1], None, [bins, bins], [0, 180, 0, 256])
+    return cv2.normalize(hist, hist).flatten()
+
+
+class SceneGate:
+    """
+    Remembers the last frame that went through full analysis. A new frame whose
+    perceptual hash and colour histogram are both close to it counts as a repeat,
+    its results can be reused instead of running YOLO / OCR again.
+    """
+
+    def __init__(self, max_hash_distance=4, min_hist_correlation=0.98):
+        self.max_hash_distance = max_hash_distance
+        self.min_hist_correlation = min_hist_correlation
+        self._hash = None
+        self._hist = None
+        self.skipped = 0
+
+    def is_repeat(self, frame, remember=True):
+        # remember=False: only compare, the caller calls remember() once the
+        # frame really has been analysed
+        frame_hash = dhash(frame)
+        hist = None
+        if self._hash is not None and bin(frame_hash ^ self._hash).count("1") <= self.max_hash_distance:
+            # hash is the cheap filter, the histogram catches colour-only changes (fire, flags)
+            hist = color_hist(frame)
+            if cv2.compareHist(self._hist, hist, cv2.HISTCMP_CORREL) >= self.min_hist_correlation:
+                self.skipped += 1
+                return True
+        if remember:
+            self._hash = frame_hash
+            self._hist = hist if hist is not None else color_hist(frame)
+        return False
+
+    def remember(self, frame):
+        self._hash = dhash(frame)
+        self._hist = color_hist(frame)
@@ -0,0 +1,45 @@
+# modules/utils/serialize.py
+# fast response serialization, orjson by default and msgpack for clients that ask for it
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import msgpack
+except ImportError:  # optional, only internal consumers use it
+    msgpack = None
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+class FastJSONResponse(JSONResponse):
+    # numpy values that slip through are serialized natively instead of failing
+    def render(self, content):
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def wants_msgpack(request):
+    accept = request.headers.get("accept", "") if request is not None else ""
+    return msgpack is not None and any(t in accept for t in MSGPACK_TYPES)
+
+
+def encode_response(content, request=None, status_code=200):
+    if wants_msgpack(request):
+        return Response(
+            msgpack.packb(content, use_bin_type=True),
+            status_code=status_code,
+            media_type="application/msgpack",
+        )
+    return FastJSONResponse(content, status_code=status_code)
+
+
+# ---- progress streams ----
+
+def sse_event(event):
+    # server-sent events frame, the event type doubles as the SSE event name
+    return b"event: " + event["type"].encode() + b"\ndata: " + orjson.dumps(
+        event, option=orjson.OPT_SERIALIZE_NUMPY
+    ) + b"\n\n"
+
+
+def ndjson_line(event):
+    return orjson.dumps(event, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE)
@@ -0,0 +1,105 @@
+# modules/utils/trace.py
+# per-request timing breakdown, on-demand profiling and the slow request log
+import json
+import logging
+import time
+from contextlib import ExitStack
+from modules import config
+from modules.utils.metrics import collect_timings, summarize_timings
+from modules.utils.profiling import profile_request
+
+_slow_log = logging.getLogger("ai.slow_requests")
+
+
+def _slow_logger():
+    # lazily, so importing this module doesn't create files
+    if not _slow_log.handlers:
+        handler = logging.FileHandler(config.SLOW_REQUEST_LOG, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _slow_log.addHandler(handler)
+        _slow_log.setLevel(logging.INFO)
+        _slow_log.propagate = False
+    return _slow_log
+
+
+def _flag(value):
+    return (value or "").lower() in ("1", "true", "yes")
+
+
+class RequestTrace:
+    """
+    with RequestTrace.from_request(request, "/analyze") as trace:
+        ...
+        trace.add_file(upload, digest)
+    return trace.decorate(response)
+    """
+
+    def __init__(self, endpoint, want_timings=False, profile=False):
+        self.endpoint = endpoint
+        self.want_timings = want_timings
+        self.profile = profile
+        self.files = []
+        self.timings = {}
+        self.total_ms = None
+        self._profile = None
+        self._stack = None
+        self._started = None
+
+    @classmethod
+    def from_request(cls, request, endpoint):
+        want_timings = _flag(request.query_params.get("timings")) or _flag(request.headers.get("x-timings"))
+        profile = config.PROFILE_REQUESTS or (
+            config.ALLOW_PROFILE_HEADER and _flag(request.headers.get("x-profile"))
+        )
+        return cls(endpoint, want_timings=want_timings, profile=profile)
+
+    def add_file(self, upload, digest):
+        self.files.append({
+            "filename": upload.filename,
+            "content_type": upload.content_type,
+            "size": getattr(upload, "size", None),
+            "sha256": digest,
+        })
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        self._stack = ExitStack()
+        self.timings = self._stack.enter_context(collect_timings())
+        self._profile = self._stack.enter_context(
+            profile_request(config.PROFILE_DIR if self.profile else None)
+        )
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stack.close()
+        self.total_ms = round((time.perf_counter() - self._started) * 1000, 2)
+        if self.total_ms >= config.SLOW_REQUEST_MS:
+            self._log_slow(failed=exc_type is not None)
+        return False
+
+    def _log_slow(self, failed=False):
+        try:
+            _slow_logger().info(json.dumps({
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "endpoint": self.endpoint,
+                "total_ms": self.total_ms,
+                "failed": failed,
+                "files": self.files,
+                "timings_ms": summarize_timings(self.timings),
+            }, ensure_ascii=False))
+        except Exception as e:
+            print("Slow request log error:", e)
+
+    def decorate(self, response):
+        # never mutate the response in place, it may be a cached result
+        if not (self.want_timings or self.profile) or not isinstance(response, dict):
+            return response
+        out = dict(response)
+        if self.want_timings:
+            out["timings"] = summarize_timings(self.timings)
+            out["timings"]["total"] = self.total_ms if self.total_ms is not None else round(
+                (time.perf_counter() - self._started) * 1000, 2
+            )
+        if self.profile and self._profile is not None:
+            out["profiles"] = list(self._profile["files"])
+        return out
@@ -0,0 +1,116 @@
+# modules/utils/tracker.py
+# lightweight person tracking between sparse YOLO detections: IoU matching on
+# detection frames, optical flow to carry the boxes along in between
+import itertools
+import cv2
+import numpy as np
+
+
+def iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    if inter <= 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / (area_a + area_b - inter)
+
+
+class Track:
+    def __init__(self, track_id, box, timestamp):
+        self.id = track_id
+        self.box = np.asarray(box, dtype=np.float32)
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.hits = 1
+
+    @property
+    def dwell_s(self):
+        return self.last_seen - self.first_seen
+
+
+class PersonTracker:
+    """
+    update() with the person boxes of a full detection frame, propagate() with
+    the frames in between. A person keeps their id while detections keep landing
+    on their (flow-shifted) box, so the same crowd isn't counted again every second.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_lost_s=2.0, min_hits=2):
+        self.iou_threshold = iou_threshold
+        self.max_lost_s = max_lost_s
+        self.min_hits = min_hits
+        self.active = []
+        self.finished = []
+        self.max_in_frame = 0
+        self._ids = itertools.count(1)
+
+    def update(self, boxes, timestamp):
+        self.max_in_frame = max(self.max_in_frame, len(boxes))
+
+        # greedy matching, best overlaps first
+        pairs = sorted(
+            ((iou(t.box, b), ti, bi) for ti, t in enumerate(self.active) for bi, b in enumerate(boxes)),
+            reverse=True,
+        )
+        matched_tracks, matched_boxes = set(), set()
+        for score, ti, bi in pairs:
+            if score < self.iou_threshold:
+                break
+            if ti in matched_tracks or bi in matched_boxes:
+                continue
+            track = self.active[ti]
+            track.box = np.asarray(boxes[bi], dtype=np.float32)
+            track.last_seen = timestamp
+            track.hits += 1
+            matched_tracks.add(ti)
+            matched_boxes.add(bi)
+
+        for bi, box in enumerate(boxes):
+            if bi not in matched_boxes:
+                self.active.append(Track(next(self._ids), box, timestamp))
+
+        self._retire(timestamp)
+
+    def propagate(self, prev_gray, gray, scale=1.0):
+        # shift every active box by the median optical flow of corners inside it
+        if not self.active or prev_gray is None:
+            return
+        for track in self.active:
+            x1, y1, x2, y2 = (track.box * scale).astype(int)
+            x1, y1 = max(x1, 0), max(y1, 0)
+            x2, y2 = min(x2, prev_gray.shape[1]), min(y2, prev_gray.shape[0])
+            if x2 - x1 < 4 or y2 - y1 < 4:
+                continue
+            mask = np.zeros_like(prev_gray)
+            mask[y1:y2, x1:x2] = 255
+            points = cv2.goodFeaturesToTrack(prev_gray, maxCorners=20, qualityLevel=0.01, minDistance=3, mask=mask)
+            if points is None:
+                continue
+            moved, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, points, None)
+            ok = status.flatten() == 1
+            if ok.sum() < 3:
+                continue
+            delta = np.median((moved[ok] - points[ok]).reshape(-1, 2), axis=0) / scale
+            track.box += np.array([delta[0], delta[1], delta[0], delta[1]], dtype=np.float32)
+
+    def _retire(self, timestamp):
+        still = []
+        for track in self.active:
+            if timestamp - track.last_seen > self.max_lost_s:
+                self.finished.append(track)
+            else:
+                still.append(track)
+        self.active = still
+
+    def summary(self):
+        tracks = [t for t in self.finished + self.active if t.hits >= self.min_hits]
+        dwell = sorted((round(t.dwell_s, 2) for t in tracks), reverse=True)
+        return {
+            "unique_people": len(tracks),
+            "max_people_in_frame": self.max_in_frame,
+            "avg_dwell_s": round(sum(dwell) / len(dwell), 2) if dwell else 0.0,
+            "max_dwell_s": dwell[0] if dwell else 0.0,
+            "dwell_times_s": dwell[:50],
+        }
@@ -0,0 +1,132 @@
+# modules/utils/upload.py
+# chunked upload handling with size caps, so memory per request doesn't grow with file size
+import hashlib
+import os
+import tempfile
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from modules import config
+
+VIDEO_EXTENSIONS = (".mp4",)
+PDF_EXTENSIONS = (".pdf",)
+
+MB = 1024 * 1024
+
+
+class UploadTooLarge(HTTPException):
+    # an HTTPException so FastAPI's body parsing lets it through instead of turning it into a 400
+    def __init__(self, limit):
+        super().__init__(status_code=413, detail=f"Upload exceeds the {limit // MB} MB limit")
+        self.limit = limit
+
+
+def size_limit(filename):
+    name = (filename or "").lower()
+    if name.endswith(VIDEO_EXTENSIONS):
+        return config.MAX_VIDEO_MB * MB
+    if name.endswith(PDF_EXTENSIONS):
+        return config.MAX_PDF_MB * MB
+    return config.MAX_IMAGE_MB * MB
+
+
+def too_large_response(e):
+    return JSONResponse(status_code=413, content={"error": e.detail})
+
+
+async def _copy_chunks(upload, out, limit):
+    # reject on the declared size before touching the body when we can
+    if getattr(upload, "size", None) is not None and upload.size > limit:
+        raise UploadTooLarge(limit)
+
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = await upload.read(config.UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > limit:
+            raise UploadTooLarge(limit)
+        digest.update(chunk)
+        out.write(chunk)
+    return digest.hexdigest(), size
+
+
+async def read_upload(upload, limit=None):
+    """Read a small upload (image) into memory, chunk by chunk, up to its cap."""
+    limit = limit or size_limit(upload.filename)
+    with tempfile.SpooledTemporaryFile(max_size=limit) as out:
+        digest, _ = await _copy_chunks(upload, out, limit)
+        out.seek(0)
+        return out.read(), digest
+
+
+async def save_upload(upload, limit=None, suffix="", dir=None):
+    """
+    Stream an upload to a private temp file on disk (video / pdf need a real path).
+    Returns (path, sha256). The caller removes the file.
+    """
+    limit = limit or size_limit(upload.filename)
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=dir)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            digest, _ = await _copy_chunks(upload, out, limit)
+    except BaseException:
+        remove_quietly(path)
+        raise
+    return path, digest
+
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class BodySizeLimitMiddleware:
+    """
+    ASGI middleware that refuses request bodies over a per-path limit.
+    Checks Content-Length up front and counts bytes for chunked bodies,
+    so an oversize upload is cut off before the multipart parser reads it all.
+    """
+
+    def __init__(self, app, limits):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope.get("path")) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        declared = headers.get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            await too_large_response(UploadTooLarge(limit))(scope, receive, send)
+            return
+
+        received = 0
+        started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise UploadTooLarge(limit)
+            return message
+
+        async def tracked_send(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except UploadTooLarge as e:
+            if not started:
+                await too_large_response(e)(scope, receive, send)
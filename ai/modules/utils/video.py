@@ -1,81 +1,431 @@
+import multiprocessing
+import multiprocessing.util
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import cv2
-from modules.detector.detect import detect_image
+from modules import config
+from modules.detector.load import get_models
+from modules.detector.detect import detect_images
 from modules.classifier.classify import classify
-from modules.utils.ocr import ocr_image
+from modules.utils.ocr import ocr_images
+from modules.utils.preprocess import downscale
+from modules.utils.metrics import stage, timed_call, merge_timings
+from modules.utils.sampling import sample_frames, sample_opencv, probe
+from modules.utils.scene import SceneGate
+from modules.utils.tracker import PersonTracker
+from modules.utils.pipeline import Pipeline, Stage, add_stats, current_worker, utilisation
+from modules.utils.aggregate import VideoAggregator
+from modules.utils.budget import BudgetExhausted, current_budget, use_budget
 import os
-def process_video(video_path, flag_model, person_model, classifier):
-    cap = cv2.VideoCapture(video_path)
 
-    frame_interval = 30  # 1 frame per sec
-    count = 0
+def analyze_frames(frames, flag_model, person_model, imgsz=None):
+    # frames: decoded BGR arrays, straight from the capture, no temp files
+    detections = detect_images(frames, flag_model, person_model, imgsz=imgsz)
+    return ocr_and_classify(frames, detections)
 
-    classification_all = []
-    ocr_all = []
-    frame_results = []  # for summary
+def ocr_and_classify(frames, detections, reader_slot=0):
+    # a request budget may allow OCR on only some (or none) of the frames
+    budget = current_budget()
+    allowed = budget.take_ocr(len(frames)) if budget is not None else len(frames)
+    try:
+        ocr_results = ocr_images(frames[:allowed], slot=reader_slot) if allowed else []
+    except Exception:
+        ocr_results = [{"text": "", "segments": []} for _ in frames[:allowed]]
+    ocr_results += [{"text": "", "segments": []} for _ in frames[allowed:]]
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+    out = []
+    for detect_results, ocr_res in zip(detections, ocr_results):
+        with stage("classify"):
+            cls_res = classify(detect_results, ocr_res.get("text", ""))
+        out.append((detect_results, ocr_res, cls_res))
+    return out
 
-        if count % frame_interval == 0:
-            temp_img = "temp_frame.jpg"
-            cv2.imwrite(temp_img, frame)
+def _worker_models(flag_model, person_model):
+    # detect workers past the first run their own copy of the models, unless the
+    # batcher already serialises every call on the shared one
+    slot = current_worker()
+    if slot == 0 or config.DETECT_BATCHING:
+        return flag_model, person_model
+    return get_models(slot)
 
-            detect_results = detect_image(temp_img, flag_model, person_model)
+def _batches(samples, batch_size, gate, max_side):
+    # groups sampled frames into batches of (index, timestamp, frame or None for a repeat)
+    pending = []
+    for index, timestamp, frame in samples:
+        if max_side:
+            frame = downscale(frame, max_side)
+        # a static scene is analysed once, repeats reuse its results
+        repeat = gate is not None and gate.is_repeat(frame)
+        pending.append((index, timestamp, None if repeat else frame))
+        if len(pending) >= batch_size:
+            yield pending
+            pending = []
+    if pending:
+        yield pending
 
-            frame_results.append(detect_results)
+def _expand(batch, analysed, last):
+    # one entry per sampled frame, repeats take the results of the last analysed frame
+    analysed = iter(analysed)
+    out = []
+    for index, timestamp, frame in batch:
+        if frame is not None:
+            last[0] = next(analysed)
+        if last[0] is None:
+            continue
+        detect_results, ocr_res, cls_res = last[0]
+        out.append((index, timestamp, detect_results, ocr_res, cls_res, frame is None))
+    return out
 
-            try:
-                ocr_res = ocr_image(temp_img)
-            except Exception:
-                ocr_res = {"text": "", "segments": []}
+def analyse_samples(samples, flag_model, person_model, batch_size, gate=None, imgsz=None, max_side=None,
+                    pipeline_stats=None):
+    """
+    Run sampled (index, timestamp, frame) tuples through detection / OCR / classify
+    in batches. Yields (index, timestamp, detect, ocr, classification, reused) in order.
+    A frame the scene gate calls a repeat reuses the last analysed frame's results.
+    With a pipeline_stats dict the batches go through the staged pipeline instead
+    and its per-stage stats are added to the dict.
+    """
+    last = [None]
+    batches = _batches(samples, batch_size, gate, max_side)
 
-            ocr_all.append(ocr_res)
+    if pipeline_stats is None:
+        for batch in batches:
+            frames = [f for _, _, f in batch if f is not None]
+            analysed = analyze_frames(frames, flag_model, person_model, imgsz=imgsz) if frames else ()
+            yield from _expand(batch, analysed, last)
+        return
 
-            cls_res = classify(detect_results, ocr_res.get("text", ""))
-            cls_res["risk_score"] = min(cls_res.get("risk_score", 0) / 100, 1.0)
-            classification_all.append(cls_res)
+    def detect_stage(batch):
+        frames = [f for _, _, f in batch if f is not None]
+        detections = detect_images(frames, *_worker_models(flag_model, person_model), imgsz=imgsz) if frames else []
+        return batch, frames, detections
+
+    def ocr_stage(item):
+        batch, frames, detections = item
+        return batch, ocr_and_classify(frames, detections, reader_slot=current_worker()) if frames else []
 
-        count += 1
+    pipeline = Pipeline(batches, [
+        Stage("detect", detect_stage, config.PIPELINE_DETECT_WORKERS),
+        Stage("ocr", ocr_stage, config.PIPELINE_OCR_WORKERS),
+    ], queue_size=config.PIPELINE_QUEUE_SIZE)
+    try:
+        for batch, analysed in pipeline.run():
+            yield from _expand(batch, analysed, last)
+    finally:
+        add_stats(pipeline_stats, pipeline.stats())
 
-    cap.release()
+def new_aggregator():
+    return VideoAggregator(
+        bucket_s=config.TIMELINE_BUCKET_S,
+        max_points=config.TIMELINE_MAX_POINTS,
+        examples=config.VIDEO_EXAMPLE_DETECTIONS,
+        max_ocr_lines=config.VIDEO_MAX_OCR_LINES,
+    )
 
-    # risk/confidence scoe
-    if len(classification_all) > 0:
-        avg_score = sum([c["risk_score"] for c in classification_all]) / len(classification_all)
+def triggers_closer_look(cls_res):
+    return bool(set(cls_res.get("ai_tags", [])) & config.ADAPTIVE_TRIGGER_TAGS)
+
+def extend_windows(windows, timestamp, radius_s, duration_s=None):
+    # adds the window around a risky coarse frame, overlapping windows are joined
+    start = max(0.0, timestamp - radius_s)
+    end = timestamp + radius_s
+    if duration_s:
+        end = min(end, duration_s)
+    if windows and start <= windows[-1][1]:
+        windows[-1][1] = max(windows[-1][1], end)
     else:
-        avg_score = 0.0
+        windows.append([start, end])
+
+def _adaptive_pass(video_path, flag_model, person_model, batch_size, info, gate, progress, add,
+                   pipeline_stats=None):
+    """
+    Coarse-to-fine: a sparse, low resolution pass over the whole clip, then dense
+    full resolution sampling only around the moments the coarse pass found risky.
+    """
+    coarse_s = config.ADAPTIVE_COARSE_EVERY_S
+    dense_s = config.ADAPTIVE_DENSE_EVERY_S
+    total_frames = info["frame_count"]
+    fps = info["fps"]
+
+    # frames are weighted by the seconds they stand for, so the extra samples in
+    # risky windows don't inflate the average. a coarse frame's weight is known
+    # once its successor is: it sits in a window if it or a neighbour is risky
+    windows = []
+    held = None  # (entry, in a window, risky)
+    coarse = sample_frames(video_path, "interval", coarse_s)
+    for entry in analyse_samples(coarse, flag_model, person_model, batch_size, gate,
+                                 imgsz=config.ADAPTIVE_COARSE_IMGSZ, max_side=config.ADAPTIVE_COARSE_MAX_SIDE,
+                                 pipeline_stats=pipeline_stats):
+        risky = triggers_closer_look(entry[4])
+        if risky:
+            extend_windows(windows, entry[1], coarse_s, info["duration_s"])
+        in_window = risky
+        if held is not None:
+            near = entry[1] - held[0][1] <= coarse_s
+            in_window = in_window or (held[2] and near)
+            add(held[0], dense_s if held[1] or (risky and near) else coarse_s)
+        held = (entry, in_window, risky)
+        if progress and total_frames > 0:
+            progress(0.5 * min(entry[0] / total_frames, 1.0))
+    if held is not None:
+        add(held[0], dense_s if held[1] else coarse_s)
+
+    # look closer between the neighbouring coarse samples of every risky one,
+    # skipping the frames the coarse pass already took
+    coarse_step = max(1, int(round(fps * coarse_s)))
+    dense_total = sum(end - start for start, end in windows) or 1.0
+    dense_done = 0.0
+    for start, end in windows:
+        window_gate = SceneGate(config.SCENE_MAX_HASH_DISTANCE, config.SCENE_MIN_HIST_CORRELATION) if gate else None
+        samples = sample_opencv(video_path, "interval", dense_s,
+                                start_frame=int(start * fps), end_frame=int(end * fps) + 1)
+        samples = (s for s in samples if s[0] % coarse_step)
+        for entry in analyse_samples(samples, flag_model, person_model, batch_size, window_gate,
+                                     pipeline_stats=pipeline_stats):
+            add(entry, dense_s)
+        dense_done += end - start
+        if progress:
+            progress(0.5 + 0.5 * dense_done / dense_total)
+
+    return {
+        "mode": "adaptive",
+        "coarse_every_s": coarse_s,
+        "dense_every_s": dense_s,
+        "windows": [[round(start, 2), round(end, 2)] for start, end in windows],
+    }
+
+def _tracking_pass(video_path, flag_model, person_model, info, gate, progress, add):
+    """
+    Full detection on every TRACK_DETECT_EVERY-th tracked frame only, optical flow
+    carries the person boxes through the frames in between. Gives unique people
+    and dwell times instead of re-counting the crowd from scratch every second.
+    """
+    tracker = PersonTracker(
+        iou_threshold=config.TRACK_IOU_THRESHOLD,
+        max_lost_s=config.TRACK_MAX_LOST_S,
+        min_hits=config.TRACK_MIN_HITS,
+    )
+    every_n = max(1, config.TRACK_DETECT_EVERY)
+    total_frames = info["frame_count"]
+    counters = {"tracked_frames": 0, "detection_frames": 0}
+
+    def detection_frames():
+        # walks every tracked frame, propagates boxes on the in-between ones and
+        # hands only the detection frames on for analysis
+        prev_gray = None
+        for i, (index, timestamp, frame) in enumerate(sample_frames(video_path, "interval", config.TRACK_EVERY_S)):
+            small = downscale(frame, config.TRACK_FLOW_MAX_SIDE)
+            scale = small.shape[1] / frame.shape[1]
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+            if i % every_n == 0:
+                yield index, timestamp, frame
+            else:
+                tracker.propagate(prev_gray, gray, scale)
+            prev_gray = gray
+            counters["tracked_frames"] += 1
 
-    # -tags
-    tags = set()
-    for c in classification_all:
-        for t in c.get("ai_tags", []):
-            tags.add(t)
+    # batch of one: the tracker needs each detection before flow continues from it
+    for entry in analyse_samples(detection_frames(), flag_model, person_model, 1, gate):
+        boxes = [p["xyxy"] for p in entry[2].get("people", [])]
+        tracker.update(boxes, entry[1])
+        add(entry)
+        counters["detection_frames"] += 1
+        if progress and total_frames > 0:
+            progress(min(entry[0] / total_frames, 1.0))
 
-    # combine
-    ocr_combined = " ".join([o.get("text", "") for o in ocr_all if o.get("text")])
+    tracking = tracker.summary()
+    tracking.update({
+        "detect_every": every_n,
+        "tracked_frames": counters["tracked_frames"],
+        "detection_frames": counters["detection_frames"],
+    })
+    return tracking
 
-    # detection  test for test
-    detections_lite = frame_results[:10]
+_segment_pool = None
+_segment_pool_lock = threading.Lock()
 
-    summary_text = " | ".join(list(tags))
+def segment_workers():
+    # VIDEO_SEGMENT_WORKERS is shared out between the inference worker processes,
+    # each of which starts its own segment pool; thread workers share one
+    if config.INFERENCE_BACKEND == "thread":
+        return config.VIDEO_SEGMENT_WORKERS
+    return config.VIDEO_SEGMENT_WORKERS // max(1, config.INFERENCE_WORKERS)
 
-    tag_counts = {}
-    for c in classification_all:
-        for t in c.get("ai_tags", []):
-            tag_counts[t] = tag_counts.get(t, 0) + 1
+def segment_pool():
+    # separate processes, each with its own models and capture, shared by all videos
+    global _segment_pool
+    with _segment_pool_lock:
+        if _segment_pool is None:
+            _segment_pool = ProcessPoolExecutor(
+                max_workers=segment_workers(),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=get_models,
+            )
+            # runs when this process exits, pool worker or server alike
+            multiprocessing.util.Finalize(None, shutdown_segment_pool, exitpriority=10)
+        return _segment_pool
 
-    reasons = [f"Detected '{t}' in multiple frames" for t in tags]
+def shutdown_segment_pool():
+    global _segment_pool
+    with _segment_pool_lock:
+        if _segment_pool is not None:
+            _segment_pool.shutdown(wait=True, cancel_futures=True)
+            _segment_pool = None
 
+def split_segments(frame_count, parts):
+    # [start_frame, end_frame) ranges of about equal length
+    size = -(-frame_count // parts)
+    return [(start, min(start + size, frame_count)) for start in range(0, frame_count, size)]
+
+def analyse_segment(video_path, start_frame, end_frame, sample_mode, sample_every_s, frame_budget,
+                    batch_size, scene_gate, pipelined):
+    # runs in a segment process: its own capture seeks to start_frame and stops at end_frame
+    flag_model, person_model = get_models()
+    gate = SceneGate(config.SCENE_MAX_HASH_DISTANCE, config.SCENE_MIN_HIST_CORRELATION) if scene_gate else None
+    pipeline_stats = {} if pipelined else None
+    aggregator = new_aggregator()
+    samples = sample_frames(video_path, sample_mode, sample_every_s, frame_budget, start_frame, end_frame)
+    for entry in analyse_samples(samples, flag_model, person_model, batch_size, gate,
+                                 pipeline_stats=pipeline_stats):
+        aggregator.add(entry)
+    return aggregator, pipeline_stats
+
+def _segmented_pass(video_path, info, sample_mode, sample_every_s, frame_budget, batch_size, scene_gate,
+                    pipelined, pipeline_stats, progress, aggregator):
+    """
+    Long clips: one time segment per process, analysed side by side, each
+    segment's aggregator is merged into the clip's.
+    The scene gate restarts at every segment boundary, at most one extra frame each.
+    """
+    ranges = split_segments(info["frame_count"], segment_workers())
+    futures = []
+    for start, end in ranges:
+        # a frame budget is shared out by segment length
+        budget = max(1, round(frame_budget * (end - start) / info["frame_count"])) if frame_budget else None
+        args = (video_path, start, end, sample_mode, sample_every_s, budget, batch_size, scene_gate, pipelined)
+        futures.append(segment_pool().submit(timed_call, analyse_segment, time.time(), None, *args))
+
+    for done, future in enumerate(as_completed(futures), 1):
+        (segment_aggregator, segment_stats), timings, _ = future.result()
+        aggregator.merge(segment_aggregator)
+        merge_timings(timings)
+        if pipeline_stats is not None and segment_stats:
+            add_stats(pipeline_stats, segment_stats)
+        if progress:
+            progress(done / len(futures))
+
+    return {"mode": sample_mode, "segments": len(ranges)}
+
+class AnalysisCancelled(Exception):
+    pass
+
+def frame_event(entry):
+    # what a progress stream shows of one analysed frame
+    index, timestamp, _, _, cls_res, reused = entry
     return {
-        "risk_score": round(avg_score, 2),
-        "ai_tags": list(tags),
-        "summary": summary_text,
-        "reasons": reasons,
-        "tag_counts": tag_counts,
-        "ocr_text": ocr_combined,
-        "detections": detections_lite,
-        "frames_analyzed": len(classification_all),
+        "type": "frame",
+        "index": index,
+        "timestamp": round(timestamp, 3),
+        "ai_tags": cls_res.get("ai_tags", []),
+        "risk_score": round(cls_res.get("risk_score", 0.0), 3),
+        "reused": reused,
     }
 
+def process_video(video_path, flag_model, person_model, classifier, progress=None, batch_size=None,
+                  sample_mode=None, sample_every_s=None, frame_budget=None, scene_gate=None, tracking=None,
+                  pipelined=None, segmented=None, on_frame=None, cancel=None, budget=None):
+    # progress: optional callback taking the fraction of the clip done (0..1)
+    # batch_size: sampled frames sent through detection / OCR together
+    # sample_mode: "interval" (one frame every sample_every_s seconds), "budget"
+    #   (frame_budget frames spread over the clip), "keyframes" (key frames only)
+    #   or "adaptive" (sparse low-res pass, then dense sampling around risky moments)
+    # scene_gate: reuse the last analysed frame's results for near-identical frames
+    # tracking: detect every few frames and track people in between (interval mode),
+    #   adds unique person counts and dwell times
+    # pipelined: decode, detection and OCR of different batches run concurrently
+    #   (not for tracking, which needs each detection before it moves on)
+    # segmented: clips longer than VIDEO_SEGMENT_MIN_S are split into one time segment
+    #   per segment process (interval / budget / keyframes modes)
+    # on_frame: called with every analysed entry as it comes (no segmenting then)
+    # cancel: event-like object, once set the analysis stops with AnalysisCancelled
+    # budget: a Budget; when it runs out the response covers what was analysed so far
+    #   and says so with partial / budget (no segmenting then)
+    batch_size = batch_size or config.VIDEO_BATCH_SIZE
+    sample_mode = sample_mode or config.VIDEO_SAMPLE_MODE
+    sample_every_s = sample_every_s or config.VIDEO_SAMPLE_EVERY_S
+    frame_budget = frame_budget or config.VIDEO_FRAME_BUDGET
+    if frame_budget and sample_mode == "interval":
+        sample_mode = "budget"
+    if scene_gate is None:
+        scene_gate = config.VIDEO_SCENE_GATE
+    if tracking is None:
+        tracking = config.VIDEO_TRACKING
+    if pipelined is None:
+        pipelined = config.VIDEO_PIPELINE
+    pipeline_stats = {} if pipelined else None
+    if segmented is None:
+        segmented = segment_workers() > 1 and on_frame is None and budget is None
+    gate = SceneGate(config.SCENE_MAX_HASH_DISTANCE, config.SCENE_MIN_HIST_CORRELATION) if scene_gate else None
+
+    info = probe(video_path)
+    total_frames = info["frame_count"]
+
+    # results are folded in frame by frame, memory doesn't grow with the clip length
+    aggregator = new_aggregator()
+
+    def add(entry, weight=1.0):
+        if cancel is not None and cancel.is_set():
+            # unwinds the sampling generators, the pipeline stops its threads
+            raise AnalysisCancelled()
+        if budget is not None:
+            budget.check()
+        aggregator.add(entry, weight)
+        if on_frame is not None:
+            on_frame(entry)
+        if budget is not None:
+            budget.take_frame(entry[4].get("risk_score", 0.0))
+
+    tracking_summary = None
+    sampling = {"mode": sample_mode}
+    try:
+        with use_budget(budget):
+            if sample_mode == "adaptive":
+                sampling = _adaptive_pass(
+                    video_path, flag_model, person_model, batch_size, info, gate, progress, add, pipeline_stats
+                )
+            elif tracking and sample_mode == "interval":
+                tracking_summary = _tracking_pass(video_path, flag_model, person_model, info, gate, progress, add)
+                sampling = {"mode": "tracking", "track_every_s": config.TRACK_EVERY_S}
+            elif (segmented and segment_workers() > 1 and info["duration_s"]
+                  and info["duration_s"] >= config.VIDEO_SEGMENT_MIN_S):
+                sampling = _segmented_pass(
+                    video_path, info, sample_mode, sample_every_s, frame_budget, batch_size, scene_gate,
+                    pipelined, pipeline_stats, progress, aggregator,
+                )
+            else:
+                # only the sampled frames are decoded, the rest are grabbed past or seeked over
+                samples = sample_frames(video_path, sample_mode, sample_every_s, frame_budget)
+                for entry in analyse_samples(samples, flag_model, person_model, batch_size, gate,
+                                             pipeline_stats=pipeline_stats):
+                    add(entry)
+                    if progress and total_frames > 0:
+                        progress(min(entry[0] / total_frames, 1.0))
+                sampling = {"mode": sample_mode}
+    except BudgetExhausted:
+        # out of time / frames, or risky enough already: answer with what there is
+        pass
+
+    if progress:
+        progress(1.0)
+
+    response = aggregator.result()
+    response["partial"] = budget is not None and budget.partial
+    if budget is not None:
+        response["budget"] = budget.report()
+    response["sampling"] = {**sampling, "fps": info["fps"], "duration_s": info["duration_s"]}
+    if tracking_summary is not None:
+        response["tracking"] = tracking_summary
+    if pipeline_stats:
+        response["pipeline"] = utilisation(pipeline_stats)
+    return response
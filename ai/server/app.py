@@ -1,148 +1,772 @@
+import asyncio
+import json
+import multiprocessing
 import os
-import shutil
-import re
-import numpy as np
-from fastapi.encoders import jsonable_encoder
-from fastapi import FastAPI, UploadFile, File
-from modules.detector.load import load_models
-from modules.detector.detect import detect_image
-from modules.classifier.classify import classify
-from modules.utils.video import process_video
-from modules.utils.ocr import ocr_image
-from modules.manifesto.extract import extract_text_from_pdf
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-
-app = FastAPI()
-
-# Load AI models
-flag_model, person_model = load_models()
-
-import numpy as np
-
-def convert_to_serializable(obj):
+import queue
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from typing import List, Optional
+from fastapi import FastAPI, UploadFile, File, Form, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from modules import config
+from modules.tasks import (
+    init_worker, ping, image_stages, images_stages, build_image_response, analyze_video, compare_manifestos,
+    analyze_frame, analyze_video_events,
+)
+from modules.classifier.classify import classify, config_version, fuse_report
+from modules.utils.cache import LRUCache, content_hash
+from modules.utils.pool import InferencePool, PoolFull
+from modules.utils.upload import (
+    BodySizeLimitMiddleware, UploadTooLarge, VIDEO_EXTENSIONS, MB,
+    read_upload, save_upload, remove_quietly, too_large_response,
+)
+from modules.detector.batch import batch_stats
+from modules.jobs.store import JobStore
+from modules.streams.monitor import StreamMonitor, RUNNING
+from modules.streams.scheduler import StreamScheduler
+from modules.utils.metrics import FRAMES_PER_VIDEO, REJECTED, GaugeFunc, render, stage
+from modules.utils.trace import RequestTrace
+from modules.utils.memory import process_memory
+from modules.utils.serialize import FastJSONResponse, encode_response, sse_event, ndjson_line
+from modules.utils.video import AnalysisCancelled, shutdown_segment_pool
+from modules.utils.budget import budget_params
+from modules.schemas import (
+    AnalyzeResponse, BatchResponse, CompareSummary, JobCreated, JobView, StreamStatus, StreamEvent,
+)
+
+# results are plain python at the source, orjson writes them out without a conversion walk
+app = FastAPI(default_response_class=FastJSONResponse)
+
+# cut oversize bodies off before the multipart parser has read them
+app.add_middleware(BodySizeLimitMiddleware, limits={
+    "/analyze": max(config.MAX_IMAGE_MB, config.MAX_VIDEO_MB) * MB,
+    "/analyze/stream": config.MAX_VIDEO_MB * MB,
+    "/manifesto/compare_summary": 2 * config.MAX_PDF_MB * MB,
+    "/analyze/batch": config.MAX_BATCH_MB * MB,
+    "/jobs": max(config.MAX_VIDEO_MB, 2 * config.MAX_PDF_MB) * MB,
+})
+
+# AI models live in the pool workers, the event loop only does I/O.
+# Each worker warms up as it starts and reports on warm_reports
+warm_reports = (
+    queue.Queue() if config.INFERENCE_BACKEND == "thread"
+    else multiprocessing.get_context("spawn").Queue()
+)
+pool = InferencePool(
+    workers=config.INFERENCE_WORKERS,
+    queue_size=config.INFERENCE_QUEUE_SIZE,
+    backend=config.INFERENCE_BACKEND,
+    initializer=init_worker,
+    initargs=(warm_reports,),
+)
+
+cache = LRUCache(
+    max_bytes=config.CACHE_MAX_MB * 1024 * 1024,
+    max_entries=config.CACHE_MAX_ENTRIES,
+)
+CLASSIFY_VERSION = config_version()
+# sampling changes what a video result means, so it is part of the cache key
+VIDEO_SETTINGS = (
+    f"{config.VIDEO_SAMPLE_MODE}:{config.VIDEO_SAMPLE_EVERY_S}:{config.VIDEO_FRAME_BUDGET}"
+    f":{int(config.VIDEO_SCENE_GATE)}:{config.SCENE_MAX_HASH_DISTANCE}:{config.SCENE_MIN_HIST_CORRELATION}"
+    f":{config.ADAPTIVE_COARSE_EVERY_S}:{config.ADAPTIVE_DENSE_EVERY_S}:{config.ADAPTIVE_COARSE_IMGSZ}"
+    f":{int(config.VIDEO_TRACKING)}:{config.TRACK_EVERY_S}:{config.TRACK_DETECT_EVERY}"
+)
+
+# readiness: workers are only routable once every model is loaded and warmed up
+readiness = {
+    "ready": False,
+    "pid": os.getpid(),
+    "worker_id": config.WORKER_ID,
+    "started_at": time.time(),
+    "time_to_ready_s": None,
+    "workers": [],
+    "error": None,
+}
+_started = time.perf_counter()
+_warm_up_task = None
+
+async def warm_pool():
+    try:
+        # workers start on demand, one ping each submitted together starts them all;
+        # ready once every one of them has reported its warm-up
+        await asyncio.gather(*(pool.run(ping) for _ in range(pool.workers)))
+        results = [await asyncio.to_thread(warm_reports.get) for _ in range(pool.workers)]
+        failed = [r["error"] for r in results if "error" in r]
+        if failed:
+            raise RuntimeError(failed[0])
+    except Exception as e:
+        readiness["error"] = str(e)
+        print("Warm-up failed:", e)
+        return
+    readiness["workers"] = list(results)
+    readiness["time_to_ready_s"] = round(time.perf_counter() - _started, 3)
+    # the server process itself, holds the models too with the thread backend / prefork
+    readiness["memory"] = process_memory()
+    readiness["ready"] = True
+    print(f"AI server ready in {readiness['time_to_ready_s']}s")
+
+@app.on_event("startup")
+async def start_warm_up():
+    # in the background, the server answers liveness checks while models load
+    global _warm_up_task
+    _warm_up_task = asyncio.create_task(warm_pool())
+
+@app.on_event("shutdown")
+def shutdown_pool():
+    pool.shutdown()
+    # thread backend: segment processes hang off the server process itself
+    shutdown_segment_pool()
+
+def busy_response():
+    REJECTED.inc()
+    return JSONResponse(
+        status_code=503,
+        content={"error": "Inference queue is full, retry later"},
+        headers={"Retry-After": str(config.RETRY_AFTER_SECONDS)},
+    )
+
+@app.exception_handler(UploadTooLarge)
+async def upload_too_large(request, exc):
+    return too_large_response(exc)
+
+# scrape-time gauges, read straight from the pool / cache
+GaugeFunc("ai_pool_in_flight", "Analyses running or waiting for a worker",
+          lambda: [({}, pool.in_flight)])
+GaugeFunc("ai_pool_queue_depth", "Analyses waiting for a free worker",
+          lambda: [({}, pool.queued)])
+GaugeFunc("ai_pool_capacity", "Running plus queued analyses allowed before rejecting",
+          lambda: [({}, pool.capacity)])
+GaugeFunc("ai_cache_hit_ratio", "Result cache hit ratio per stage",
+          lambda: [({"stage": k}, v["hit_ratio"]) for k, v in cache.stats()["stages"].items()])
+GaugeFunc("ai_cache_bytes", "Result cache size in bytes",
+          lambda: [({}, cache.bytes)])
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/healthz/live")
+def healthz_live():
+    return {"status": "alive"}
+
+@app.get("/healthz/ready")
+def healthz_ready():
+    if not readiness["ready"]:
+        return FastJSONResponse(readiness, status_code=503)
+    return readiness
+
+@app.get("/health")
+def health():
+    out = {"status": "ok", "pool": pool.stats(), "cache": cache.stats()}
+    if pool.backend == "thread":
+        # batchers live next to the models, only visible when that is this process
+        out["batching"] = batch_stats()
+    return out
+
+def image_cache_keys(digest):
+    return {
+        "detect": ("detect", config.DETECT_VERSION, digest),
+        "ocr": ("ocr", config.OCR_VERSION, digest),
+        # classification depends on the detector output too
+        "classify": ("classify", f"{CLASSIFY_VERSION}/{config.DETECT_VERSION}", digest),
+    }
+
+def classify_cached(digest, detect_results):
+    # cheap enough to run on the event loop
+    key = image_cache_keys(digest)["classify"]
+    classified_results = cache.get(key)
+    if classified_results is None:
+        with stage("classify"):
+            classified_results = classify(detect_results)
+        cache.put(key, classified_results)
+    return classified_results
+
+async def analyze_image_cached(data, digest=None):
+    digest = digest or content_hash(data)
+    keys = image_cache_keys(digest)
+
+    detect_results = cache.get(keys["detect"])
+    ocr_results = cache.get(keys["ocr"])
+    if detect_results is None or ocr_results is None:
+        stages = await pool.run(image_stages, data, detect_results is None, ocr_results is None)
+        if detect_results is None:
+            detect_results = stages["detect"]
+            cache.put(keys["detect"], detect_results)
+        if ocr_results is None:
+            ocr_results = stages["ocr"]
+            cache.put(keys["ocr"], ocr_results)
+
+    classified_results = classify_cached(digest, detect_results)
+    return build_image_response(detect_results, ocr_results, classified_results)
+
+async def analyze_images_cached(items):
+    # items: [(data, digest)], uncached images go to one worker as a single batch
+    stages = [None] * len(items)
+    missing = []
+    for i, (_, digest) in enumerate(items):
+        keys = image_cache_keys(digest)
+        detect_results = cache.get(keys["detect"])
+        ocr_results = cache.get(keys["ocr"])
+        if detect_results is None or ocr_results is None:
+            missing.append(i)
+        else:
+            stages[i] = {"detect": detect_results, "ocr": ocr_results}
+
+    if missing:
+        fresh = await pool.run(images_stages, [items[i][0] for i in missing])
+        for i, result in zip(missing, fresh):
+            stages[i] = result
+            if "error" not in result:
+                keys = image_cache_keys(items[i][1])
+                cache.put(keys["detect"], result["detect"])
+                cache.put(keys["ocr"], result["ocr"])
+
+    responses = []
+    for (_, digest), result in zip(items, stages):
+        if "error" in result:
+            responses.append(result)
+            continue
+        classified_results = classify_cached(digest, result["detect"])
+        responses.append(build_image_response(result["detect"], result["ocr"], classified_results))
+    return responses
+
+def video_cache_key(digest):
+    return (
+        "video",
+        f"{config.VIDEO_VERSION}/{config.DETECT_VERSION}/{config.OCR_VERSION}/{CLASSIFY_VERSION}/{VIDEO_SETTINGS}",
+        digest,
+    )
+
+# server-wide limits, a request can set its own
+DEFAULT_BUDGET = {
+    "max_ms": config.BUDGET_MAX_MS,
+    "max_frames": config.BUDGET_MAX_FRAMES,
+    "max_ocr_calls": config.BUDGET_MAX_OCR_CALLS,
+    "stop_risk": config.BUDGET_STOP_RISK,
+}
+
+def request_budget(max_ms=None, max_frames=None, max_ocr_calls=None, stop_risk=None):
+    for value in (max_ms, max_frames, max_ocr_calls, stop_risk):
+        if value is not None and value < 0:
+            raise ValueError("Budget limits can't be negative")
+    return budget_params(max_ms, max_frames, max_ocr_calls, stop_risk, defaults=DEFAULT_BUDGET)
+
+async def analyze_video_cached(file_path, digest, job=None, budget=None):
+    # a complete cached result answers any budget
+    video_key = video_cache_key(digest)
+    response = cache.get(video_key)
+    if response is not None:
+        return response
+
+    response = await pool.run(analyze_video, file_path, job, budget)
+    FRAMES_PER_VIDEO.observe(response.get("frames_analyzed", 0))
+    if not response.get("partial"):
+        cache.put(video_key, response)
+    return response
+
+@app.post("/analyze", response_model=AnalyzeResponse)
+async def analyze(
+    request: Request,
+    file: UploadFile = File(...),
+    # video only: stop early and return a partial result past these
+    max_ms: Optional[int] = Form(None),
+    max_frames: Optional[int] = Form(None),
+    max_ocr_calls: Optional[int] = Form(None),
+    stop_risk: Optional[float] = Form(None),
+):
+    with RequestTrace.from_request(request, "/analyze") as trace:
+        try:
+            if file.filename.lower().endswith(VIDEO_EXTENSIONS):
+                budget = request_budget(max_ms, max_frames, max_ocr_calls, stop_risk)
+                # opencv needs a real file for video, stream it to a private one
+                tmp_file_path, digest = await save_upload(file, suffix=".mp4")
+                trace.add_file(file, digest)
+                try:
+                    response = await analyze_video_cached(tmp_file_path, digest, budget=budget)
+                finally:
+                    remove_quietly(tmp_file_path)
+            else:
+                data, digest = await read_upload(file)
+                trace.add_file(file, digest)
+                response = await analyze_image_cached(data, digest)
+        except PoolFull:
+            return busy_response()
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": str(e)})
+
+    return encode_response(trace.decorate(response), request)
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def _progress_channel():
+    # (queue, cancel event) a pool worker can use: plain ones next to thread
+    # workers, manager proxies across process boundaries
+    global _manager
+    if pool.backend == "thread":
+        return queue.Queue(), threading.Event()
+    # runs in to_thread: two first requests at once must not each start a manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = multiprocessing.get_context("spawn").Manager()
+    return _manager.Queue(), _manager.Event()
+
+@app.on_event("shutdown")
+def stop_manager():
+    if _manager is not None:
+        _manager.shutdown()
+
+@app.post("/analyze/stream")
+async def analyze_stream(
+    request: Request,
+    file: UploadFile = File(...),
+    max_ms: Optional[int] = Form(None),
+    max_frames: Optional[int] = Form(None),
+    max_ocr_calls: Optional[int] = Form(None),
+    stop_risk: Optional[float] = Form(None),
+):
     """
-    Recursively convert NumPy / torch types to Python native types.
-    Works for dict, list, tuple, int, float, str.
+    Video analysis with progress: one "frame" event per analysed frame, then a
+    "result" event carrying the usual /analyze response. Server-sent events for
+    clients that accept text/event-stream, newline-delimited JSON otherwise.
+    Disconnecting stops the analysis, so do the same budget limits as /analyze.
     """
-    import torch
-
-    if isinstance(obj, dict):
-        return {k: convert_to_serializable(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_to_serializable(v) for v in obj]
-    elif isinstance(obj, tuple):
-        return tuple(convert_to_serializable(v) for v in obj)
-    elif isinstance(obj, (np.integer,)):
-        return int(obj)
-    elif isinstance(obj, (np.floating,)):
-        return float(obj)
-    elif isinstance(obj, (np.ndarray, torch.Tensor)):
-        return convert_to_serializable(obj.tolist())
-    else:
-        return obj
-
-@app.post("/analyze")
-async def analyze(file: UploadFile = File(...)):
-    tmp_file_path = f"temp_{file.filename}"
-    with open(tmp_file_path, "wb") as f:
-        f.write(await file.read())
-    
-    if file.filename.endswith(".mp4"):
-        response = process_video(tmp_file_path, flag_model, person_model, classify)
-    else:
-        detect_results = detect_image(tmp_file_path, flag_model, person_model)
-        ocr_results = ocr_image(tmp_file_path)
-        classified_results = classify(detect_results)
+    if not (file.filename or "").lower().endswith(VIDEO_EXTENSIONS):
+        return JSONResponse(status_code=400, content={"error": "Only video files can be streamed"})
+    try:
+        budget = request_budget(max_ms, max_frames, max_ocr_calls, stop_risk)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    if pool.in_flight >= pool.capacity:
+        return busy_response()
+
+    tmp_file_path, digest = await save_upload(file, suffix=".mp4")
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    encode = sse_event if sse else ndjson_line
+
+    cached = cache.get(video_cache_key(digest))
+    if cached is not None:
+        remove_quietly(tmp_file_path)
+
+        async def replay():
+            yield encode({"type": "result", "result": cached})
+        return StreamingResponse(replay(), media_type="text/event-stream" if sse else "application/x-ndjson")
+
+    events, cancel = await asyncio.to_thread(_progress_channel)
+    task = asyncio.ensure_future(pool.run(analyze_video_events, tmp_file_path, events, cancel, budget))
+    # the worker may still be reading the file after the client has gone
+    task.add_done_callback(lambda _: remove_quietly(tmp_file_path))
+
+    async def progress():
+        try:
+            while True:
+                if await request.is_disconnected():
+                    return
+                try:
+                    event = await asyncio.to_thread(events.get, True, 0.5)
+                except queue.Empty:
+                    if task.done():
+                        break
+                    continue
+                yield encode(event)
+
+            # whatever the worker queued right before it returned
+            while True:
+                try:
+                    yield encode(events.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                response = await task
+            except PoolFull:
+                REJECTED.inc()
+                yield encode({"type": "error", "error": "Server busy, retry later"})
+                return
+            except Exception as e:
+                yield encode({"type": "error", "error": str(e)})
+                return
+            FRAMES_PER_VIDEO.observe(response.get("frames_analyzed", 0))
+            if not response.get("partial"):
+                cache.put(video_cache_key(digest), response)
+            yield encode({"type": "result", "result": response})
+        finally:
+            # client gone (or the stream torn down): the worker stops at its next frame
+            if not task.done():
+                cancel.set()
+                task.add_done_callback(_ignore_cancelled)
+
+    return StreamingResponse(progress(), media_type="text/event-stream" if sse else "application/x-ndjson")
+
+def _ignore_cancelled(task):
+    # retrieve the AnalysisCancelled so asyncio doesn't log it as unhandled
+    if not task.cancelled():
+        error = task.exception()
+        if error is not None and not isinstance(error, AnalysisCancelled):
+            print("Stream analysis error:", error)
+
+BATCH_RETRY_S = 0.5
+
+async def retry_when_full(call):
+    # part of an admitted batch: wait for room rather than throw away what the
+    # rest of the batch has already analysed
+    while True:
+        try:
+            return await call()
+        except PoolFull:
+            await asyncio.sleep(BATCH_RETRY_S)
+
+@app.post("/analyze/batch", response_model=BatchResponse)
+async def analyze_batch(
+    request: Request,
+    files: List[UploadFile] = File(...),
+    title: str = Form(""),
+    description: str = Form(""),
+):
+    if len(files) > config.MAX_BATCH_FILES:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"At most {config.MAX_BATCH_FILES} files per batch"},
+        )
+
+    # admit the whole batch up front: one call for the images, videos at most
+    # one per worker at a time
+    is_video = [(f.filename or "").lower().endswith(VIDEO_EXTENSIONS) for f in files]
+    needed = int(not all(is_video)) + min(sum(is_video), pool.workers)
+    if not pool.has_room(needed):
+        return busy_response()
+
+    images, videos = [], []  # (position, data/path, digest)
+    video_slots = asyncio.Semaphore(pool.workers)
+
+    async def analyse_video(path, digest):
+        async with video_slots:
+            return await retry_when_full(lambda: analyze_video_cached(path, digest, budget=request_budget()))
+
+    with RequestTrace.from_request(request, "/analyze/batch") as trace:
+        try:
+            for i, upload in enumerate(files):
+                if is_video[i]:
+                    path, digest = await save_upload(upload, suffix=".mp4")
+                    videos.append((i, path, digest))
+                else:
+                    data, digest = await read_upload(upload)
+                    images.append((i, data, digest))
+                trace.add_file(upload, digest)
+
+            # all images share one batched worker call, videos run side by side
+            image_items = [(data, digest) for _, data, digest in images]
+            outcomes = await asyncio.gather(
+                retry_when_full(lambda: analyze_images_cached(image_items)),
+                *(analyse_video(path, digest) for _, path, digest in videos),
+                return_exceptions=True,
+            )
+        finally:
+            for _, path, _ in videos:
+                remove_quietly(path)
+
+        results = [None] * len(files)
+        image_outcome = outcomes[0]
+        for j, (i, _, _) in enumerate(images):
+            if isinstance(image_outcome, Exception):
+                results[i] = {"error": str(image_outcome)}
+            else:
+                results[i] = image_outcome[j]
+        for (i, _, _), outcome in zip(videos, outcomes[1:]):
+            results[i] = {"error": str(outcome)} if isinstance(outcome, Exception) else outcome
+
+        # report text: what the reporter wrote plus whatever OCR read off the media
+        texts = [title, description]
+        for r in results:
+            texts.append(r.get("ocr_text") or (r.get("ocr") or {}).get("text") or "")
+        analysed = [r for r in results if "error" not in r]
 
         response = {
-            "ai_tags": classified_results.get('ai_tags'),
-            "risk_score": classified_results.get('risk_score'),
-            "summary": classified_results.get('summary'),
-            "objects": detect_results,
-            "ocr": ocr_results
+            "files": [{"filename": f.filename, **r} for f, r in zip(files, results)],
+            "report": fuse_report(analysed, " ".join(t for t in texts if t)),
         }
 
+    return encode_response(trace.decorate(response), request)
+
+
+@app.post("/manifesto/compare_summary", response_model=CompareSummary)
+async def manifesto_compare_summary(
+    request: Request,
+    file_a: UploadFile = File(...),
+    file_b: UploadFile = File(...),
+    # bound the OCR of scanned PDFs: time, and pages OCR'd over both files
+    max_ms: Optional[int] = Form(None),
+    max_ocr_calls: Optional[int] = Form(None),
+):
     try:
-        os.remove(tmp_file_path)
-    except:
-        pass
-    
-    # Convert all nested objects to Python native types
-    response_serializable = convert_to_serializable(response)
-    return response_serializable
-
-def split_paragraphs(text):
-    return [p.strip() for p in text.split("\n") if len(p.strip()) > 20]
-
-def simple_extractive_summary(text, max_sentences=5):
-    sentences = re.split(r'(?<=[.!?])\s+', text.strip())
-    scored = sorted(sentences, key=lambda s: len(s), reverse=True)
-    return " ".join(scored[:max_sentences])
-
-def compare_texts_simple(text_a, text_b, top_k=5):
-    paras_a = split_paragraphs(text_a)
-    paras_b = split_paragraphs(text_b)
-    all_paras = paras_a + paras_b
-
-    vectorizer = TfidfVectorizer().fit(all_paras)
-    tfidf_a = vectorizer.transform(paras_a)
-    tfidf_b = vectorizer.transform(paras_b)
-
-    cos_scores = cosine_similarity(tfidf_a, tfidf_b)
-    overall_score = float(cos_scores.mean())
-
-    # Top similar paragraph pairs
-    flat = cos_scores.flatten()
-    idxs = np.argsort(-flat)[:top_k]
-    top_pairs = []
-    for idx in idxs:
-        i = int(idx // cos_scores.shape[1])
-        j = int(idx % cos_scores.shape[1])
-        score = float(cos_scores[i, j])
-        top_pairs.append({
-            "score": round(score, 3),
-            "para_a": paras_a[i],
-            "para_b": paras_b[j]
-        })
-
-    # Unique paragraphs
-    unique_a = [p for i,p in enumerate(paras_a) if not any(cos_scores[i,j]>0.5 for j in range(len(paras_b)))]
-    unique_b = [p for j,p in enumerate(paras_b) if not any(cos_scores[i,j]>0.5 for i in range(len(paras_a)))]
+        budget = request_budget(max_ms, max_ocr_calls=max_ocr_calls)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    if budget:
+        # frame and risk limits don't apply to PDFs
+        budget.pop("max_frames", None)
+        budget.pop("stop_risk", None)
+
+    with RequestTrace.from_request(request, "/manifesto/compare_summary") as trace:
+        # Save uploaded files, chunked and capped
+        tmp_a = tmp_b = None
+        try:
+            tmp_a, digest_a = await save_upload(file_a, limit=config.MAX_PDF_MB * MB, suffix=".pdf")
+            trace.add_file(file_a, digest_a)
+            tmp_b, digest_b = await save_upload(file_b, limit=config.MAX_PDF_MB * MB, suffix=".pdf")
+            trace.add_file(file_b, digest_b)
+            result = await pool.run(compare_manifestos, tmp_a, tmp_b, budget or None)
+        except PoolFull:
+            return busy_response()
+        finally:
+            # Cleanup
+            for tmp in (tmp_a, tmp_b):
+                if tmp:
+                    remove_quietly(tmp)
+
+    return FastJSONResponse(trace.decorate(result))
+
+
+# ---- async jobs ----
+
+jobs = JobStore(config.JOBS_DB)
+job_slots = asyncio.Semaphore(config.JOB_CONCURRENCY)
+# keep references so running job tasks aren't garbage collected
+_job_tasks = set()
+
+JOB_KINDS = {"analyze": 1, "manifesto_compare": 2}  # kind -> number of files
+# urlopen would also follow file: and ftp: callbacks
+CALLBACK_SCHEMES = ("http", "https")
+
+def valid_callback_url(url):
+    parts = urllib.parse.urlsplit(url)
+    return parts.scheme.lower() in CALLBACK_SCHEMES and bool(parts.netloc)
+
+def schedule_job(job_id):
+    task = asyncio.create_task(run_job(job_id))
+    _job_tasks.add(task)
+    task.add_done_callback(_job_tasks.discard)
+
+@app.on_event("startup")
+async def resume_jobs():
+    os.makedirs(config.JOBS_DIR, exist_ok=True)
+    if config.WORKER_ID != 0:
+        # several server processes share the jobs db, only the first one resumes
+        return
+    # pick up whatever was queued or running when the server went down
+    for job_id in jobs.unfinished():
+        schedule_job(job_id)
 
+async def execute_job(job_id, job):
+    inputs = job["inputs"]
+    if job["kind"] == "manifesto_compare":
+        return await pool.run(compare_manifestos, inputs[0]["path"], inputs[1]["path"])
+
+    upload = inputs[0]
+    if upload["filename"].lower().endswith(VIDEO_EXTENSIONS):
+        return await analyze_video_cached(
+            upload["path"], upload["digest"], job=(config.JOBS_DB, job_id), budget=request_budget(),
+        )
+    with open(upload["path"], "rb") as f:
+        data = f.read()
+    return await analyze_image_cached(data, upload["digest"])
+
+async def run_job(job_id):
+    async with job_slots:
+        job = jobs.get(job_id)
+        if job is None:
+            return
+        jobs.mark_running(job_id)
+        try:
+            while True:
+                try:
+                    result = await execute_job(job_id, job)
+                    break
+                except PoolFull:
+                    # jobs are not in a hurry, wait for room instead of failing
+                    await asyncio.sleep(config.RETRY_AFTER_SECONDS)
+            jobs.finish(job_id, result)
+        except Exception as e:
+            print("Job error:", job_id, e)
+            jobs.fail(job_id, e)
+        # a CancelledError (server shutting down) skips this: the job stays
+        # unfinished with its inputs on disk, and resume_jobs runs it again
+        for upload in job["inputs"]:
+            remove_quietly(upload["path"])
+
+    # jobs stored before callback URLs were checked are held to the same rule
+    if job["callback_url"] and valid_callback_url(job["callback_url"]):
+        await send_callback(job["callback_url"], job_view(jobs.get(job_id)))
+
+def _post_json(url, payload):
+    req = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(req, timeout=config.CALLBACK_TIMEOUT_SECONDS) as resp:
+        return resp.status
+
+async def send_callback(url, payload):
+    try:
+        await asyncio.to_thread(_post_json, url, payload)
+    except Exception as e:
+        print("Job callback error:", url, e)
+
+def job_view(job):
     return {
-        "overall_score": round(overall_score,3),
-        "top_pairs": top_pairs,
-        "summary_a": simple_extractive_summary(text_a),
-        "summary_b": simple_extractive_summary(text_b),
-        "unique_a": unique_a[:5],
-        "unique_b": unique_b[:5]
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
     }
 
+@app.post("/jobs", status_code=202, response_model=JobCreated)
+async def create_job(
+    files: List[UploadFile] = File(...),
+    kind: str = Form("analyze"),
+    callback_url: Optional[str] = Form(None),
+):
+    if kind not in JOB_KINDS:
+        return JSONResponse(status_code=400, content={"error": f"Unknown job kind '{kind}'"})
+    if len(files) != JOB_KINDS[kind]:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"'{kind}' jobs take {JOB_KINDS[kind]} file(s), got {len(files)}"},
+        )
+    if callback_url and not valid_callback_url(callback_url):
+        return JSONResponse(status_code=400, content={"error": "callback_url must be an http(s):// URL"})
 
-@app.post("/manifesto/compare_summary")
-async def manifesto_compare_summary(file_a: UploadFile = File(...), file_b: UploadFile = File(...)):
-    tmp_a = f"tmp_{file_a.filename}"
-    tmp_b = f"tmp_{file_b.filename}"
+    inputs = []
+    try:
+        for upload in files:
+            limit = config.MAX_PDF_MB * MB if kind == "manifesto_compare" else None
+            suffix = os.path.splitext(upload.filename or "")[1]
+            path, digest = await save_upload(upload, limit=limit, suffix=suffix, dir=config.JOBS_DIR)
+            inputs.append({"path": path, "filename": upload.filename, "digest": digest})
+    except BaseException:
+        for upload in inputs:
+            remove_quietly(upload["path"])
+        raise
 
-    # Save uploaded files
-    with open(tmp_a, "wb") as f:
-        shutil.copyfileobj(file_a.file, f)
-    with open(tmp_b, "wb") as f:
-        shutil.copyfileobj(file_b.file, f)
+    job_id = jobs.create(kind, inputs, callback_url=callback_url)
+    schedule_job(job_id)
+    return FastJSONResponse({"job_id": job_id, "status": "queued"}, status_code=202)
 
-    # Extract text from PDFs (with OCR fallback)
-    text_a = extract_text_from_pdf(tmp_a)
-    text_b = extract_text_from_pdf(tmp_b)
+@app.get("/jobs/{job_id}", response_model=JobView)
+def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found"})
+    return FastJSONResponse(job_view(job))
 
-    # Compare texts
-    result = compare_texts_simple(text_a, text_b)
 
-    # Cleanup
-    try:
-        os.remove(tmp_a)
-        os.remove(tmp_b)
-    except Exception:
-        pass
+# ---- live streams ----
+# a stream lives in the server process that accepted it, run one server process
+# (no PREFORK_WORKERS) when streams are in use
+
+STREAM_SCHEMES = ("rtsp", "rtsps", "http", "https")
+
+streams = {}
+_stream_tasks = {}
+# every stream draws on one frames-per-second budget
+stream_scheduler = StreamScheduler()
+
+def _stream_gauge(field):
+    return lambda: [({"stream": k}, m.status()[field]) for k, m in streams.items() if m.state == RUNNING]
+
+GaugeFunc("ai_stream_lag_seconds", "Age of the newest analysed frame of each stream", _stream_gauge("lag_s"))
+GaugeFunc("ai_stream_frames_dropped", "Frames read but replaced before analysis, per stream",
+          _stream_gauge("frames_dropped"))
+GaugeFunc("ai_stream_ticks_missed", "Sampling ticks skipped while a frame was being analysed, per stream",
+          _stream_gauge("ticks_missed"))
+GaugeFunc("ai_stream_busy_drops", "Frames lost to a full inference pool, per stream", _stream_gauge("busy_drops"))
+GaugeFunc("ai_stream_allocated_fps", "Frames per second the scheduler allots each stream",
+          _stream_gauge("allocated_fps"))
+GaugeFunc("ai_stream_fps_budget", "Frames per second shared by all streams",
+          lambda: [({}, stream_scheduler.budget_fps)])
+
+async def analyse_stream_frame(frame):
+    return await pool.run(analyze_frame, frame)
+
+def prune_streams(now=None):
+    # forget streams that ended a while ago, and the oldest ended ones past MAX_STREAMS
+    now = now or time.time()
+    ended = sorted((m for m in streams.values() if m.ended_at is not None), key=lambda m: m.ended_at)
+    for i, monitor in enumerate(ended):
+        if now - monitor.ended_at > config.STREAM_KEEP_ENDED_S or len(ended) - i > config.MAX_STREAMS:
+            streams.pop(monitor.id, None)
+            _stream_tasks.pop(monitor.id, None)
+
+@app.on_event("shutdown")
+def stop_streams():
+    for monitor in streams.values():
+        monitor.stop()
+
+@app.post("/streams", status_code=201, response_model=StreamStatus)
+async def create_stream(
+    source: str = Form(...),
+    fps: float = Form(config.STREAM_DEFAULT_FPS),
+    loop: bool = Form(False),
+    name: str = Form(""),
+):
+    # only network streams: file:// and the like would read server files through ffmpeg
+    scheme = urllib.parse.urlsplit(source).scheme.lower()
+    if scheme not in STREAM_SCHEMES and not (config.STREAM_ALLOW_FILES and os.path.isfile(source)):
+        return JSONResponse(status_code=400, content={"error": "source must be an rtsp(s):// or http(s):// URL"})
+    if not 0 < fps <= config.STREAM_MAX_FPS:
+        return JSONResponse(status_code=400, content={"error": f"fps must be in (0, {config.STREAM_MAX_FPS}]"})
+    prune_streams()
+    if sum(1 for m in streams.values() if m.state == RUNNING) >= config.MAX_STREAMS:
+        return JSONResponse(status_code=429, content={"error": f"At most {config.MAX_STREAMS} streams"})
+
+    stream_id = uuid.uuid4().hex
+    monitor = StreamMonitor(stream_id, source, analyse_stream_frame, fps=fps, loop=loop, name=name,
+                            scheduler=stream_scheduler)
+    streams[stream_id] = monitor
+    _stream_tasks[stream_id] = asyncio.create_task(monitor.run())
+    return FastJSONResponse(monitor.status(), status_code=201)
+
+@app.get("/streams", response_model=List[StreamStatus])
+def list_streams():
+    prune_streams()
+    return FastJSONResponse([m.status() for m in streams.values()])
+
+@app.get("/streams/schedule")
+def get_stream_schedule():
+    return FastJSONResponse(stream_scheduler.stats())
+
+@app.get("/streams/{stream_id}", response_model=StreamStatus)
+def get_stream(stream_id: str):
+    monitor = streams.get(stream_id)
+    if monitor is None:
+        return JSONResponse(status_code=404, content={"error": "Stream not found"})
+    return FastJSONResponse(monitor.status())
+
+@app.get("/streams/{stream_id}/events", response_model=List[StreamEvent])
+def get_stream_events(stream_id: str, after: int = 0):
+    # poll with the last seq seen to get only what's new
+    monitor = streams.get(stream_id)
+    if monitor is None:
+        return JSONResponse(status_code=404, content={"error": "Stream not found"})
+    return FastJSONResponse(monitor.events(after))
 
-    return result
+@app.delete("/streams/{stream_id}", response_model=StreamStatus)
+async def delete_stream(stream_id: str):
+    monitor = streams.pop(stream_id, None)
+    if monitor is None:
+        return JSONResponse(status_code=404, content={"error": "Stream not found"})
+    monitor.stop()
+    task = _stream_tasks.pop(stream_id, None)
+    if task is not None:
+        task.cancel()
+    return FastJSONResponse(monitor.status())
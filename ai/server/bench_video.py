@@ -0,0 +1,50 @@
+# server/bench_video.py
+# frames/sec of process_video on local clips, e.g. the reports uploaded to the web app:
+#
+#   cd ai && python -m server.bench_video ../aspnet/ElectionShield/ElectionShield/wwwroot/uploads/reports/*.mp4
+#   cd ai && python -m server.bench_video clip.mp4 --opt batch_size=1
+#
+# --opt key=value is passed straight to process_video, to compare settings.
+import argparse
+import time
+from modules.detector.load import get_models
+from modules.classifier.classify import classify
+from modules.utils.video import process_video
+from modules.tasks import warm_up
+
+
+def parse_opt(text):
+    key, _, value = text.partition("=")
+    for cast in (int, float):
+        try:
+            return key, cast(value)
+        except ValueError:
+            pass
+    if value.lower() in ("true", "false"):
+        return key, value.lower() == "true"
+    return key, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark process_video")
+    parser.add_argument("clips", nargs="+")
+    parser.add_argument("--opt", action="append", default=[], type=parse_opt)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    options = dict(args.opt)
+    warm_up()
+    flag_model, person_model = get_models()
+
+    for clip in args.clips:
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            result = process_video(clip, flag_model, person_model, classify, **options)
+            elapsed = time.perf_counter() - started
+            frames = result.get("frames_analyzed", 0)
+            print(f"{clip}: {frames} frames in {elapsed:.2f}s "
+                  f"({frames / elapsed if elapsed else 0:.2f} frames/s) risk={result.get('risk_score')}")
+
+
+if __name__ == "__main__":
+    main()
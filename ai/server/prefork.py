@@ -0,0 +1,140 @@
+# server/prefork.py
+# preforking server: load the models once in the master, then fork workers that
+# share the weight pages copy-on-write instead of each loading its own copy.
+#
+#   cd ai && python -m server.prefork --workers 4 --port 8000
+#
+# each worker serves the normal app with the thread backend, so requests use the
+# models inherited from the master.
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+# must be decided before modules.config is imported anywhere
+os.environ["INFERENCE_BACKEND"] = "thread"
+
+from modules import config
+from modules.detector.load import get_models
+from modules.utils.ocr import get_reader
+from modules.utils.memory import process_memory
+
+
+def share_weights(flag_model, person_model, reader):
+    # torch modules -> shared memory, so writes (e.g. layer fusing) don't un-share pages
+    for model in (flag_model, person_model):
+        if model is not None:
+            model.model.share_memory()
+    for module in (getattr(reader, "detector", None), getattr(reader, "recognizer", None)):
+        if module is not None and hasattr(module, "share_memory"):
+            module.share_memory()
+
+
+def preload():
+    started = time.perf_counter()
+    flag_model, person_model = get_models()
+    reader = get_reader()
+    if config.PREFORK_SHARE_MEMORY:
+        share_weights(flag_model, person_model, reader)
+    # everything allocated so far lives as long as the workers, keep the GC from
+    # touching those objects (and dirtying their pages) after the fork
+    gc.collect()
+    gc.freeze()
+    return round(time.perf_counter() - started, 3)
+
+
+def bind(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(worker_id, sock, args):
+    os.environ["WORKER_ID"] = str(worker_id)
+    config.WORKER_ID = worker_id
+    import uvicorn
+    from server.app import app
+
+    server = uvicorn.Server(uvicorn.Config(app, log_level=args.log_level))
+    server.run(sockets=[sock])
+
+
+def spawn(worker_id, sock, args):
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(worker_id, sock, args)
+        except Exception as e:
+            print(f"Worker {worker_id} crashed:", e)
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def report_memory(workers, load_s):
+    print(f"[prefork] master pid={os.getpid()} model load {load_s}s memory={process_memory()}")
+    for pid, worker_id in sorted(workers.items(), key=lambda kv: kv[1]):
+        print(f"[prefork] worker {worker_id} pid={pid} memory={process_memory(pid)}")
+    sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preforking AI server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=config.PREFORK_WORKERS)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--report-after", type=float, default=60.0,
+                        help="seconds after start to print per-worker memory")
+    args = parser.parse_args()
+
+    load_s = preload()
+    sock = bind(args.host, args.port)
+
+    workers = {}
+    for worker_id in range(args.workers):
+        workers[spawn(worker_id, sock, args)] = worker_id
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    report_at = time.monotonic() + args.report_after
+    while workers:
+        if report_at and time.monotonic() >= report_at:
+            report_memory(workers, load_s)
+            report_at = None
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.5)
+            continue
+        worker_id = workers.pop(pid, None)
+        if worker_id is not None and not stopping:
+            # a crashed worker is replaced, it still inherits the preloaded models
+            print(f"[prefork] worker {worker_id} exited ({status}), restarting")
+            workers[spawn(worker_id, sock, args)] = worker_id
+
+
+if __name__ == "__main__":
+    main()
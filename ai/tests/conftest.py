@@ -0,0 +1,21 @@
+# tests run from ai/, like the server: make `modules` importable
+import os
+import sys
+from types import SimpleNamespace
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _obj(name):
+    return {"name": name, "class": 0, "confidence": 0.9, "xyxy": [0, 0, 10, 10]}
+
+
+@pytest.fixture
+def max_risk():
+    """A frame every classify() rule fires on: crowd, weapon, suspicious bag, political and bribery text."""
+    from modules.classifier.classify import classify
+
+    detect = {"objects": [_obj("person")] * 6 + [_obj("knife"), _obj("handbag")], "people": [], "flags": []}
+    text = "vote for us, free gift"
+    return SimpleNamespace(detect=detect, text=text, classification=classify(detect, text))
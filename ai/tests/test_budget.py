@@ -0,0 +1,57 @@
+import pytest
+from modules.classifier.classify import classify
+from modules.utils.budget import Budget, BudgetExhausted
+
+
+def test_max_risk_frame_scores_one(max_risk):
+    assert max_risk.classification["risk_score"] == 1.0
+
+
+def test_stop_risk_stops_before_the_next_frame(max_risk):
+    budget = Budget(stop_risk=1.0)
+    budget.check()
+    budget.take_frame(max_risk.classification["risk_score"])
+    with pytest.raises(BudgetExhausted):
+        budget.check()
+    assert budget.stopped_by == "stop_risk"
+    assert budget.partial
+
+
+def test_budget_hit_on_last_frame_is_not_partial():
+    budget = Budget(max_frames=2)
+    for _ in range(2):
+        budget.check()
+        budget.take_frame(0.1)
+    assert not budget.partial
+
+
+def test_ocr_calls_are_capped():
+    budget = Budget(max_ocr_calls=4)
+    assert [budget.take_ocr(3), budget.take_ocr(3), budget.take_ocr(1)] == [3, 1, 0]
+    assert budget.ocr_skipped == 3
+
+
+def test_process_video_stops_at_max_risk(tmp_path, monkeypatch, max_risk):
+    cv2 = pytest.importorskip("cv2")
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("ultralytics")
+    pytest.importorskip("easyocr")
+    from modules.utils import video
+
+    path = str(tmp_path / "clip.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 5, (64, 64))
+    for _ in range(20):
+        writer.write(np.zeros((64, 64, 3), dtype=np.uint8))
+    writer.release()
+
+    monkeypatch.setattr(video, "detect_images", lambda frames, *a, **k: [max_risk.detect for _ in frames])
+    monkeypatch.setattr(video, "ocr_images", lambda frames, slot=0: [{"text": max_risk.text, "segments": []} for _ in frames])
+
+    response = video.process_video(
+        path, None, None, classify, batch_size=1, sample_mode="interval", sample_every_s=0.2,
+        scene_gate=False, tracking=False, pipelined=False, segmented=False, budget=Budget(stop_risk=1.0),
+    )
+    assert response["risk_score"] == 1.0
+    assert response["frames_analyzed"] == 1
+    assert response["partial"]
+    assert response["budget"]["stopped_by"] == "stop_risk"
@@ -0,0 +1,26 @@
+import pytest
+from modules.classifier.classify import classify, fuse_report
+
+PERSON = {"name": "person", "class": 0, "confidence": 0.9, "xyxy": [0, 0, 10, 10]}
+
+
+def _video_result(risk):
+    # what the video aggregator reports for a clip whose frames all score `risk`
+    return {"risk_score": risk, "ai_tags": ["crowd"]}
+
+
+def test_image_and_video_risk_share_a_scale():
+    image = classify({"objects": [PERSON] * 6}, "")
+    video = _video_result(image["risk_score"])
+    assert fuse_report([image])["media_risk"] == fuse_report([video])["media_risk"]
+
+
+def test_risky_video_outweighs_calm_image():
+    calm = classify({"objects": [PERSON]}, "")
+    report = fuse_report([calm, _video_result(0.8)])
+    assert report["media_risk"] == pytest.approx(0.8)
+
+
+def test_file_risk_is_clamped():
+    assert fuse_report([_video_result(5.0)])["media_risk"] == 1.0
+    assert fuse_report([_video_result(-1.0)])["media_risk"] == 0.0
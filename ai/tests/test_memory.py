@@ -0,0 +1,19 @@
+import builtins
+from modules.utils import memory
+
+
+def test_no_resource_module_means_no_memory(monkeypatch):
+    real_import = builtins.__import__
+
+    def no_resource(name, *args, **kwargs):
+        if name == "resource":
+            raise ImportError(name)
+        return real_import(name, *args, **kwargs)
+
+    def no_proc(*args, **kwargs):
+        raise OSError("no /proc")
+
+    # windows: neither smaps_rollup nor the resource module
+    monkeypatch.setattr(builtins, "__import__", no_resource)
+    monkeypatch.setattr(builtins, "open", no_proc)
+    assert memory.process_memory() == {}
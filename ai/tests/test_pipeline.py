@@ -0,0 +1,46 @@
+import threading
+import time
+from modules.utils.pipeline import Pipeline, Stage
+
+
+def test_results_come_back_in_source_order():
+    def slow_odd(x):
+        if x % 2:
+            time.sleep(0.01)
+        return x * 10
+
+    pipeline = Pipeline(range(10), [Stage("work", slow_odd, workers=3)])
+    assert list(pipeline.run()) == [x * 10 for x in range(10)]
+
+
+def test_closing_early_waits_for_running_stages():
+    running = threading.Event()
+    finished = []
+
+    def slow(x):
+        if x == 1:
+            running.set()
+            time.sleep(1.5)
+            finished.append(x)
+        return x
+
+    run = Pipeline(range(5), [Stage("slow", slow)], queue_size=1).run()
+    assert next(run) == 0
+    running.wait()
+    run.close()
+    # the stage call in flight is done before close() returns, nobody still holds the model
+    assert finished == [1]
+
+
+def test_each_stage_worker_knows_its_slot():
+    from modules.utils.pipeline import current_worker
+    seen = set()
+
+    def record(x):
+        time.sleep(0.01)
+        seen.add(current_worker())
+        return x
+
+    assert list(Pipeline(range(12), [Stage("work", record, workers=3)], queue_size=4).run()) == list(range(12))
+    assert seen <= {0, 1, 2} and len(seen) > 1
+    assert current_worker() == 0
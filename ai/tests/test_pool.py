@@ -0,0 +1,29 @@
+import asyncio
+import threading
+import pytest
+from modules.utils.pool import InferencePool, PoolFull
+
+
+def test_has_room_counts_calls_in_flight():
+    release = threading.Event()
+
+    async def main():
+        pool = InferencePool(workers=1, queue_size=1, backend="thread")
+        try:
+            assert pool.has_room(2)
+            first = asyncio.ensure_future(pool.run(release.wait))
+            await asyncio.sleep(0.05)
+            assert pool.has_room(1) and not pool.has_room(2)
+            second = asyncio.ensure_future(pool.run(release.wait))
+            await asyncio.sleep(0.05)
+            assert not pool.has_room(1)
+            with pytest.raises(PoolFull):
+                await pool.run(release.wait)
+            release.set()
+            await asyncio.gather(first, second)
+            assert pool.has_room(2)
+        finally:
+            release.set()
+            pool.shutdown()
+
+    asyncio.run(main())
@@ -0,0 +1,40 @@
+import time
+from types import SimpleNamespace
+import pytest
+from modules.streams.scheduler import StreamScheduler, share_budget
+
+
+def _stream(stream_id, fps=2.0, last_high_risk_at=None):
+    return SimpleNamespace(id=stream_id, fps=fps, last_high_risk_at=last_high_risk_at)
+
+
+def test_overload_cuts_equal_streams_evenly():
+    rates = share_budget({"a": 2, "b": 2, "c": 2}, {"a": 1, "b": 1, "c": 1}, 3)
+    assert rates == pytest.approx({"a": 1, "b": 1, "c": 1})
+
+
+def test_recently_risky_stream_gets_a_bigger_share():
+    scheduler = StreamScheduler(budget_fps=3, risk_weight=3, priority_window_s=60, min_fps=0)
+    risky = _stream("risky", last_high_risk_at=time.time())
+    calm = [_stream("calm1"), _stream("calm2")]
+    for s in [risky] + calm:
+        scheduler.register(s)
+
+    assert scheduler.weight(risky) == 3
+    assert scheduler.rate_for(risky) > scheduler.rate_for(calm[0])
+    assert scheduler.rate_for(risky) + sum(scheduler.rate_for(s) for s in calm) == pytest.approx(3)
+
+
+def test_priority_wears_off():
+    scheduler = StreamScheduler(budget_fps=3, risk_weight=3, priority_window_s=60)
+    assert scheduler.weight(_stream("old", last_high_risk_at=time.time() - 120)) == 1.0
+
+
+def test_risky_frame_marks_the_monitor(max_risk):
+    pytest.importorskip("cv2")
+    from modules.streams.monitor import StreamMonitor
+
+    scheduler = StreamScheduler(budget_fps=3, risk_weight=3, priority_window_s=60)
+    monitor = StreamMonitor("cam", "rtsp://camera", None, fps=2.0, scheduler=scheduler)
+    monitor._update(max_risk.classification, time.time())
+    assert scheduler.weight(monitor) == 3
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from modules.classifier.classify import classify
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from modules.streams.monitor import StreamMonitor  # noqa: E402
+from modules.utils.pool import PoolFull  # noqa: E402
+
+
+def _clip(path, frames=20, fps=10):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (64, 64))
+    for i in range(frames):
+        writer.write(np.full((64, 64, 3), i * 10 % 255, dtype=np.uint8))
+    writer.release()
+
+
+def test_risky_local_file_emits_risk_event(tmp_path, max_risk):
+    path = str(tmp_path / "camera.mp4")
+    _clip(path)
+
+    async def analyse(frame):
+        return max_risk.detect, {"text": max_risk.text, "segments": []}, max_risk.classification
+
+    monitor = StreamMonitor("cam", path, analyse, fps=5)
+    asyncio.run(asyncio.wait_for(monitor.run(), timeout=10))
+
+    events = monitor.events()
+    assert monitor.frames_analyzed > 0
+    assert events and events[0]["type"] == "risk"
+    assert events[0]["risk_score"] == 1.0
+    assert monitor.last_high_risk_at is not None
+
+
+def test_frame_lost_to_a_full_pool_is_not_a_reference(tmp_path):
+    dark = np.zeros((64, 64, 3), dtype=np.uint8)
+    bright = np.full((64, 64, 3), 255, dtype=np.uint8)
+    bright[:, :32] = 0
+    calls = []
+
+    async def analyse(frame):
+        calls.append(frame)
+        if len(calls) == 2:
+            raise PoolFull()
+        return {}, {"text": "", "segments": []}, classify({}, "")
+
+    async def feed():
+        monitor = StreamMonitor("cam", str(tmp_path / "none"), analyse)
+        await monitor._analyse(dark, 0.0)
+        await monitor._analyse(bright, 0.0)  # dropped
+        await monitor._analyse(bright, 0.0)  # must be analysed, not taken for a repeat
+        return monitor
+
+    monitor = asyncio.run(feed())
+    assert len(calls) == 3
+    assert monitor.busy_drops == 1 and monitor.frames_skipped == 0